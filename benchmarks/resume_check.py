@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Resumable upload check
+
+Runs upload_asset_resumable against a stand-in upload-session server on
+localhost that drops connections on purpose, then resumes the upload and
+checks that the server assembled the exact file with every chunk's
+checksum verified on completion.
+
+Scenarios:
+    mid-chunk    the connection drops while a chunk body is being sent,
+                 so the server never stores it
+    after-store  the server stores a chunk, then drops the connection
+                 before answering, so the client never journals it
+
+Usage:
+    python benchmarks/resume_check.py                     # Repository core.py
+    python benchmarks/resume_check.py --core /tmp/old/core.py
+
+Runs with a scratch HOME, so your real config and upload journals are
+never touched. Exits non-zero if a scenario fails.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHUNK_SIZE = 64 * 1024
+FILE_SIZE = 10 * CHUNK_SIZE + 1234
+DROP_INDEX = 3
+
+
+# ============================================
+# STAND-IN SERVER
+# ============================================
+
+class SessionHandler(BaseHTTPRequestHandler):
+    """
+    The chunked upload session protocol of upload_asset_resumable.
+    
+    While server.drop is set to 'mid-chunk' or 'after-store', every PUT of
+    chunk DROP_INDEX loses its connection at that point.
+    """
+    
+    protocol_version = "HTTP/1.1"
+    
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+    
+    def _drop(self):
+        self.connection.shutdown(socket.SHUT_RDWR)
+        self.close_connection = True
+    
+    def do_POST(self):
+        sessions = self.server.sessions
+        parts = self.path.strip("/").split("/")
+        body = json.loads(self._body() or b"{}")
+        if self.path == "/api/v1/upload/asset/sessions":
+            upload_id = uuid.uuid4().hex
+            sessions[upload_id] = {"size": body["size"], "chunk_size": body["chunk_size"], "chunks": {}}
+            return self._send(201, {"upload_id": upload_id, "chunk_size": body["chunk_size"]})
+        if parts[-1] == "complete" and parts[-2] in sessions:
+            session = sessions[parts[-2]]
+            count = max(1, -(-session["size"] // session["chunk_size"]))
+            checksums = body.get("chunks", [])
+            if len(checksums) != count or set(session["chunks"]) != set(range(count)):
+                return self._send(400, {"error": "missing chunks"})
+            for index, checksum in enumerate(checksums):
+                if checksum != hashlib.sha256(session["chunks"][index]).hexdigest():
+                    return self._send(400, {"error": f"checksum mismatch for chunk {index}"})
+            data = b"".join(session["chunks"][i] for i in range(count))
+            return self._send(201, {"url": f"stub://{parts[-2]}", "sha256": hashlib.sha256(data).hexdigest()})
+        self._send(404, {"error": "not found"})
+    
+    def do_GET(self):
+        session = self.server.sessions.get(self.path.rstrip("/").split("/")[-1])
+        if session is None:
+            return self._send(404, {"error": "no such session"})
+        self._send(200, {"received": sorted(session["chunks"])})
+    
+    def do_PUT(self):
+        parts = self.path.strip("/").split("/")
+        session = self.server.sessions.get(parts[-3])
+        if session is None:
+            return self._send(404, {"error": "no such session"})
+        index = int(parts[-1])
+        drop = self.server.drop if index == DROP_INDEX else None
+        if drop == "mid-chunk":
+            self.rfile.read(int(self.headers.get("Content-Length", 0)) // 2)
+            return self._drop()
+        chunk = self._body()
+        if hashlib.sha256(chunk).hexdigest() != self.headers.get("X-Chunk-SHA256"):
+            return self._send(400, {"error": "checksum mismatch"})
+        session["chunks"][index] = chunk
+        if drop == "after-store":
+            return self._drop()
+        self._send(200, {"index": index})
+    
+    def log_message(self, *args):
+        pass
+
+
+def start_session_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SessionHandler)
+    server.daemon_threads = True
+    server.sessions = {}
+    server.drop = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================
+# CHECK
+# ============================================
+
+def check(core, server, scratch: Path, drop: str) -> str:
+    """Interrupt an upload with drop, resume it; returns a failure message or ''."""
+    api_url = f"http://127.0.0.1:{server.server_port}"
+    asset = scratch / f"{drop}.bin"
+    asset.write_bytes(os.urandom(FILE_SIZE))
+    expected = hashlib.sha256(asset.read_bytes()).hexdigest()
+    
+    # No retries, so the dropped connection reaches the caller
+    client = core.MarketplaceClient(api_url, "token", max_retries=0)
+    server.drop = drop
+    try:
+        core.upload_asset_resumable(str(asset), api_url, "token", client=client, chunk_size=CHUNK_SIZE)
+        return "upload was not interrupted"
+    except Exception:
+        pass
+    finally:
+        server.drop = None
+        client.close()
+    
+    client = core.MarketplaceClient(api_url, "token", max_retries=0)
+    try:
+        result = core.upload_asset_resumable(str(asset), api_url, "token", client=client,
+                                             resume=True, chunk_size=CHUNK_SIZE)
+    except Exception as e:
+        return f"resume failed: {e}"
+    finally:
+        client.close()
+    if result.get("sha256") != expected:
+        return "server assembled a different file"
+    if len(server.sessions) != 1:
+        return f"resume started a new session ({len(server.sessions)} sessions)"
+    if core.get_pending_uploads():
+        return "upload journal left behind"
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check resumable uploads against dropped connections.")
+    parser.add_argument("--core", default=str(ROOT / "core.py"), help="core.py to test (default: the repository's)")
+    args = parser.parse_args()
+    
+    scratch = Path(tempfile.mkdtemp(prefix="agenco-resume-"))
+    os.environ["HOME"] = str(scratch)
+    os.environ["AGENCO_NO_DAEMON"] = "1"
+    sys.path.insert(0, str(Path(args.core).resolve().parent))
+    import core
+    
+    failed = 0
+    try:
+        for drop in ("mid-chunk", "after-store"):
+            server = start_session_server()
+            try:
+                error = check(core, server, scratch, drop)
+            finally:
+                server.shutdown()
+            print(f"  [{'FAIL' if error else 'OK'}] {drop}" + (f": {error}" if error else ""))
+            failed += bool(error)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Agenco benchmarks
+
+Times the registry, search, content assembly and publish paths of core.py
+against synthetic registries, and saves the results as JSON so runs can be
+compared across versions. Runs offline: publishing goes to a stub HTTP
+server on localhost.
+
+Usage:
+    python benchmarks/run.py                       # 10, 1000, 10000 and 100000 prompts
+    python benchmarks/run.py --sizes 10,1000       # Quicker run
+    python benchmarks/run.py --core /tmp/old/core.py -o old.json   # Another version
+    python benchmarks/run.py --compare old.json new.json           # Compare two runs
+
+Each size runs in its own process with a scratch HOME, registries and
+core.py copy, so your real registries, index and config are never touched.
+Benchmarks for functions the core.py under test does not have are skipped.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+RESULTS_VERSION = 1
+
+WORDS = (
+    "agent context prompt review refactor parser lexer token stream cache index "
+    "widget deploy python golang rust test docs design api schema query vector "
+    "memory thread socket payload publish search ranking latency throughput"
+).split()
+
+
+# ============================================
+# SYNTHETIC DATA
+# ============================================
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _write_text(path: Path, rng: random.Random, size: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = []
+    written = 0
+    while written < size:
+        line = _sentence(rng, 12) + "\n"
+        lines.append(line)
+        written += len(line)
+    path.write_text("".join(lines))
+
+
+def generate_corpus(root: Path, agents: int, agent_files: int, file_kb: int, depth: int) -> dict:
+    """
+    Files shared by every size: agent files and a deep documentation tree.
+    
+    Returns:
+        dict with 'agent_files' [[path, ...] per agent], 'tree' (directory)
+        and 'tree_files' (text files in the tree)
+    """
+    rng = random.Random(1)
+    agent_paths = []
+    for a in range(agents):
+        paths = []
+        for f in range(agent_files):
+            path = root / "agents" / f"agent-{a:03d}" / f"part-{f:02d}.md"
+            _write_text(path, rng, file_kb * 1024)
+            paths.append(str(path))
+        agent_paths.append(paths)
+    
+    # Three subdirectories per level, four text files and an asset in each
+    tree = root / "docs"
+    tree_files = []
+    level = [tree]
+    for d in range(depth + 1):
+        next_level = []
+        for directory in level:
+            for f in range(4):
+                path = directory / f"page-{f}.md"
+                _write_text(path, rng, rng.randint(2, 20) * 1024)
+                tree_files.append(str(path))
+            directory.joinpath("diagram.png").write_bytes(os.urandom(4096))
+            if d < depth:
+                next_level.extend(directory / f"section-{s}" for s in range(3))
+        level = next_level
+    tree.joinpath(".gitignore").write_text("*.tmp\nbuild/\n")
+    
+    return {"agent_files": agent_paths, "tree": str(tree), "tree_files": tree_files}
+
+
+def generate_workspace(workspace: Path, core: Path, corpus: dict, prompts: int) -> None:
+    """A scratch install: core.py plus registries with the given number of prompts."""
+    rng = random.Random(prompts)
+    workspace.mkdir(parents=True)
+    (workspace / "home").mkdir()
+    shutil.copy(core, workspace / "core.py")
+    
+    agents = [
+        {
+            "name": f"agent-{a:03d}",
+            "description": _sentence(rng, 8),
+            "files": paths,
+            "tags": [rng.choice(WORDS)],
+        }
+        for a, paths in enumerate(corpus["agent_files"])
+    ]
+    tree_files = corpus["tree_files"]
+    contexts = [
+        {
+            "name": f"context-{c:03d}",
+            "description": _sentence(rng, 8),
+            "files": tree_files[c * 50 % len(tree_files):][:50],
+        }
+        for c in range(10)
+    ]
+    prompt_records = [
+        {
+            "name": f"prompt-{p:06d}",
+            "description": _sentence(rng, 6),
+            "prompt": _sentence(rng, rng.randint(20, 120)),
+            "tags": [rng.choice(WORDS)],
+        }
+        for p in range(prompts)
+    ]
+    for key, records in (("agents", agents), ("contexts", contexts), ("prompts", prompt_records)):
+        with open(workspace / f"{key}.json", "w") as f:
+            json.dump({key: records}, f, indent=2)
+
+
+# ============================================
+# STUB MARKETPLACE
+# ============================================
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Accepts any POST, reading the body (sized or chunked), and answers 201."""
+    
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, every
+    # keep-alive request would wait ~40 ms for a delayed ACK and the
+    # publish benchmarks would time the stub rather than core.py
+    disable_nagle_algorithm = True
+    
+    def do_POST(self):
+        received = 0
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                self.rfile.read(size + 2)
+                received += size
+                if size == 0:
+                    break
+        else:
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            received = length
+    
+        body = json.dumps({"id": "bench", "received": received}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================
+# BENCHMARKS (run inside the workspace process)
+# ============================================
+
+def accepts(fn, parameter: str) -> bool:
+    """Whether this version of a core.py function takes the parameter."""
+    return parameter in inspect.signature(fn).parameters
+
+
+def run_benchmarks(workspace: Path, corpus: dict, api_url: str, repeat: int) -> dict:
+    """Time each path against the workspace's core.py."""
+    sys.path.insert(0, str(workspace))
+    import core
+    
+    results = {}
+    
+    def bench(name, fn, setup=None, runs=repeat, requires=()):
+        if not all(hasattr(core, attr) for attr in requires):
+            return  # Not in this version of core.py
+        times = []
+        try:
+            for _ in range(runs):
+                if setup:
+                    setup()
+                start = time.perf_counter()
+                fn()
+                times.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"    {name:<36} [ERROR] {results[name]['error']}", file=sys.stderr)
+            return
+        results[name] = {
+            "min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3),
+            "mean_ms": round(statistics.mean(times), 3),
+            "runs": runs,
+        }
+        print(f"    {name:<36} {results[name]['median_ms']:>10.2f} ms", file=sys.stderr)
+    
+    def cold_registry():
+        if hasattr(core, "invalidate_registry_cache"):
+            core.invalidate_registry_cache()
+    
+    def cold_content():
+        if hasattr(core, "clear_content_cache"):
+            core.clear_content_cache(disk=False)
+    
+    # Registry
+    bench("load_json.prompts", lambda: core.load_json(core.PROMPTS_FILE))
+    bench("get_prompts.cold", core.get_prompts, setup=cold_registry)
+    bench("get_prompts.warm", core.get_prompts)
+    bench("get_prompt.cold", lambda: core.get_prompt("prompt-000000"), setup=cold_registry)
+    bench("get_prompt.warm", lambda: core.get_prompt("prompt-000000"))
+    bench("get_agents", core.get_agents)
+    bench("get_contexts", core.get_contexts)
+    
+    # Search
+    bench("search_index.build", lambda: core.rebuild_search_index(), runs=1, requires=("rebuild_search_index",))
+    bench("search_all.review", lambda: core.search_all("review"))
+    bench("search_all.two_words", lambda: core.search_all("schema latency"))
+    bench("search_all.no_match", lambda: core.search_all("zzzzzz"))
+    bench("search_ranked.review", lambda: core.search_ranked("review"), requires=("search_ranked",))
+    bench("search_ranked.typo", lambda: core.search_ranked("refactr"), requires=("search_ranked",))
+    bench("iter_search.first", lambda: next(core.iter_search("latency"), None), requires=("iter_search",))
+    
+    # Content assembly
+    bench("get_agent_content.cold", lambda: core.get_agent_content("agent-000"), setup=cold_content)
+    bench("get_agent_content.warm", lambda: core.get_agent_content("agent-000"))
+    bench("get_context_content.cold", lambda: core.get_context_content("context-000"), setup=cold_content)
+    bench("get_context_content.warm", lambda: core.get_context_content("context-000"))
+    tree = Path(corpus["tree"])
+    bench("get_directory_files.flat", lambda: core.get_directory_files(tree))
+    if accepts(core.get_directory_files, "recursive"):
+        bench("get_directory_files.recursive", lambda: core.get_directory_files(tree, recursive=True))
+    
+    # Publish payloads
+    bench("build_prompt_payload", lambda: core.build_prompt_payload("prompt-000000"),
+          requires=("build_prompt_payload",))
+    bench("build_agent_payload", lambda: core.build_agent_payload("agent-000"), requires=("build_agent_payload",))
+    bench("build_context_payload", lambda: core.build_context_payload("context-000"),
+          requires=("build_context_payload",))
+    bench("payload_hash.agent", lambda: core.payload_hash(core.build_agent_payload("agent-000")),
+          requires=("payload_hash", "build_agent_payload"))
+    
+    # Publish against the stub server
+    def publish(fn, name):
+        force = {"force": True} if accepts(fn, "force") else {}
+        return lambda: fn(name, api_url=api_url, token="bench", **force)
+    
+    bench("publish_prompt", publish(core.publish_prompt, "prompt-000000"))
+    bench("publish_agent", publish(core.publish_agent, "agent-000"))
+    bench("publish_context", publish(core.publish_context, "context-000"))
+    pattern = "prompt-0000??" if len(core.get_prompts()) >= 100 else "prompt-*"
+    bench("publish_all.prompts", lambda: core.publish_all(
+        ("prompts",), patterns=[pattern], api_url=api_url, token="bench", force=True),
+        runs=1, requires=("publish_all",))
+    bench("publish_all.prompts.unchanged", lambda: core.publish_all(
+        ("prompts",), patterns=[pattern], api_url=api_url, token="bench"),
+        runs=1, requires=("publish_all",))
+    directory_args = {"recursive": True} if accepts(core.publish_context_from_directory, "recursive") else {}
+    bench("publish_context_from_directory", lambda: core.publish_context_from_directory(
+        str(tree), "bench-docs", api_url=api_url, token="bench", include_assets=False, **directory_args))
+    
+    return results
+
+
+# ============================================
+# RUNNER
+# ============================================
+
+def git_revision(core: Path) -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=core.parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    core = Path(args.core).resolve()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    root = Path(tempfile.mkdtemp(prefix="agenco-bench-"))
+    server = start_stub_server()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    report = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "core": str(core),
+        "git": git_revision(core),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"repeat": args.repeat, "agents": args.agents, "agent_files": args.agent_files,
+                     "file_kb": args.file_kb, "depth": args.depth},
+        "sizes": {},
+    }
+    try:
+        print(f"[Info] Generating corpus in {root}", file=sys.stderr)
+        corpus = generate_corpus(root / "corpus", args.agents, args.agent_files, args.file_kb, args.depth)
+        corpus_file = root / "corpus.json"
+        corpus_file.write_text(json.dumps(corpus))
+    
+        for size in sizes:
+            print(f"[Info] {size} prompts", file=sys.stderr)
+            workspace = root / f"prompts-{size}"
+            generate_workspace(workspace, core, corpus, size)
+            env = dict(
+                os.environ,
+                HOME=str(workspace / "home"),
+                AGENCO_NO_DAEMON="1",
+                AGENCO_STORAGE="json",
+                AGENCO_DISK_CACHE="0",
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", str(workspace), str(corpus_file), api_url, str(args.repeat)],
+                env=env, stdout=subprocess.PIPE, check=True
+            ).stdout
+            report["sizes"][str(size)] = json.loads(output)
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+    return report
+
+
+def compare(base_file: str, new_file: str, threshold: float) -> int:
+    """Print median times side by side; returns 1 if anything got slower than threshold."""
+    base = json.loads(Path(base_file).read_text())
+    new = json.loads(Path(new_file).read_text())
+    print(f"{'benchmark':<44} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    
+    slower = 0
+    for size in new["sizes"]:
+        if size not in base["sizes"]:
+            continue
+        print(f"\n{size} prompts")
+        for name, result in new["sizes"][size].items():
+            before = base["sizes"][size].get(name)
+            if "error" in result or (before and "error" in before):
+                print(f"  {name:<42} {'error':>10}")
+                continue
+            if before is None:
+                print(f"  {name:<42} {'-':>10} {result['median_ms']:>10.2f}")
+                continue
+            change = (result["median_ms"] - before["median_ms"]) / max(before["median_ms"], 0.001)
+            flag = ""
+            if change > threshold:
+                flag = "  slower"
+                slower += 1
+            elif change < -threshold:
+                flag = "  faster"
+            print(f"  {name:<42} {before['median_ms']:>10.2f} {result['median_ms']:>10.2f} {change:>+7.0%}{flag}")
+    
+    print(f"\n{slower} benchmark{'s' if slower != 1 else ''} slower by more than {threshold:.0%}")
+    return 1 if slower else 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        workspace, corpus_file, api_url, repeat = sys.argv[2:6]
+        results = run_benchmarks(Path(workspace), json.loads(Path(corpus_file).read_text()), api_url, int(repeat))
+        json.dump(results, sys.stdout)
+        return
+    
+    parser = argparse.ArgumentParser(description="Benchmark core.py against synthetic registries.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Prompt counts, comma separated")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark (median is reported)")
+    parser.add_argument("--core", default=str(REPO_DIR / "core.py"), help="core.py to benchmark")
+    parser.add_argument("--agents", type=int, default=20, help="Number of agents")
+    parser.add_argument("--agent-files", type=int, default=8, help="Files per agent")
+    parser.add_argument("--file-kb", type=int, default=256, help="Size of each agent file in KB")
+    parser.add_argument("--depth", type=int, default=5, help="Depth of the context directory tree")
+    parser.add_argument("-o", "--output", help="Results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated workspace")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two results files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Change reported as slower/faster (0.10 = 10%%)")
+    args = parser.parse_args()
+    
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    
+    report = run(args)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['created'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"[OK] Results saved to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
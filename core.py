@@ -3,8 +3,16 @@ Agenco CLI - Core Logic
 Manages agents, contexts, and prompts from JSON files.
 """
 
+import codecs
+import functools
 import json
+import math
 import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from typing import Optional
 
@@ -19,11 +27,152 @@ CONFIG_DIR = Path.home() / ".agenco"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 
 
+# ============================================
+# TRACING
+# ============================================
+
+# Spans recorded while tracing is on (--trace or AGENCO_TRACE): (name,
+# category, start, duration, thread id, args). None when off, so span()
+# and @traced cost a single check.
+_trace_spans = None
+_trace_file = None
+_trace_start = 0.0
+_trace_lock = threading.Lock()
+_NO_SPAN = nullcontext()
+
+
+def enable_tracing(trace_file: Optional[str] = None) -> None:
+    """
+    Start recording spans. At exit a summary table is printed to stderr,
+    and if trace_file is given the spans are written there in Chrome trace
+    format (open in chrome://tracing or https://ui.perfetto.dev).
+    """
+    global _trace_spans, _trace_file, _trace_start
+    import atexit
+    
+    if _trace_spans is None:
+        atexit.register(_finish_tracing)
+    _trace_spans = []
+    _trace_file = trace_file
+    _trace_start = time.perf_counter()
+
+
+def tracing_enabled() -> bool:
+    """Whether spans are being recorded."""
+    return _trace_spans is not None
+
+
+@contextmanager
+def _record_span(name: str, category: str, args: dict):
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        duration = time.perf_counter() - start
+        with _trace_lock:
+            _trace_spans.append((name, category, start, duration, threading.get_ident(), args))
+
+
+def span(name: str, category: str = "core", **args):
+    """
+    Time a block when tracing is on.
+    
+        with span("GET /api/v1/me", "http") as info:
+            ...
+            if info is not None:
+                info["status"] = 200
+    
+    Yields the span's args dict (to add details to), or None when off.
+    """
+    if _trace_spans is None:
+        return _NO_SPAN
+    return _record_span(name, category, args)
+
+
+def traced(category: str, name: Optional[str] = None):
+    """Decorator: record each call of the function as a span when tracing is on."""
+    def decorate(fn):
+        label = name or fn.__name__
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _trace_spans is None:
+                return fn(*args, **kwargs)
+            with _record_span(label, category, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def trace_summary() -> list:
+    """
+    Recorded spans grouped by name, largest total first.
+    
+    Returns:
+        List of dicts with 'name', 'category', 'count', 'total', 'max' (seconds)
+    """
+    groups = {}
+    with _trace_lock:
+        spans = list(_trace_spans or [])
+    for name, category, _, duration, _, _ in spans:
+        group = groups.setdefault((category, name), {"name": name, "category": category, "count": 0, "total": 0.0, "max": 0.0})
+        group["count"] += 1
+        group["total"] += duration
+        group["max"] = max(group["max"], duration)
+    return sorted(groups.values(), key=lambda group: group["total"], reverse=True)
+
+
+def write_chrome_trace(path: str) -> None:
+    """Write recorded spans as Chrome trace 'complete' events."""
+    with _trace_lock:
+        spans = list(_trace_spans or [])
+    events = [
+        {
+            "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": thread,
+            "ts": round((start - _trace_start) * 1e6, 1), "dur": round(duration * 1e6, 1),
+            "args": args,
+        }
+        for name, category, start, duration, thread, args in spans
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _finish_tracing() -> None:
+    """Print the summary table to stderr and write the trace file, if any."""
+    import sys
+    
+    wall = time.perf_counter() - _trace_start
+    summary = trace_summary()
+    out = sys.stderr
+    print(f"\n[Trace] {sum(g['count'] for g in summary)} spans in {wall * 1000:.1f} ms "
+          "(nested spans are counted in their parents too)", file=out)
+    if summary:
+        print(f"   {'Span':<40} {'Category':<8} {'Calls':>6} {'Total ms':>10} {'Max ms':>9} {'% wall':>7}", file=out)
+        for group in summary:
+            print(f"   {group['name'][:40]:<40} {group['category']:<8} {group['count']:>6} "
+                  f"{group['total'] * 1000:>10.2f} {group['max'] * 1000:>9.2f} "
+                  f"{group['total'] / wall * 100 if wall else 0:>6.1f}%", file=out)
+    if _trace_file:
+        try:
+            write_chrome_trace(_trace_file)
+            print(f"[Trace] Chrome trace written to {_trace_file}", file=out)
+        except OSError as e:
+            print(f"[WARN] Could not write trace file: {e}", file=out)
+
+
+# AGENCO_TRACE=1 prints the summary; any other value is also the trace file
+_trace_setting = os.getenv("AGENCO_TRACE", "")
+if _trace_setting.lower() not in ("", "0", "false", "no"):
+    enable_tracing(None if _trace_setting.lower() in ("1", "true", "yes") else _trace_setting)
+
+
 def expand_path(path: str) -> Path:
     """Expand ~ and environment variables in path."""
     return Path(os.path.expanduser(os.path.expandvars(path)))
 
 
+@traced("json")
 def load_json(filepath: Path) -> dict:
     """Load JSON file, return empty dict if not found."""
     if not filepath.exists():
@@ -32,322 +181,1949 @@ def load_json(filepath: Path) -> dict:
         return json.load(f)
 
 
+@traced("json")
 def save_json(filepath: Path, data: dict) -> None:
-    """Save data to JSON file with pretty formatting."""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Save data to JSON file with pretty formatting.
+    
+    The file is written to a temporary file in the same directory and
+    renamed over the original, so readers never see a partial file.
+    """
+    import tempfile
+    
+    filepath = Path(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(filepath).st_mode & 0o777)
+        except OSError:
+            pass  # New file: keep mkstemp's permissions
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    invalidate_registry_cache(filepath)
 
 
 # ============================================
-# AGENTS
+# REGISTRY CACHE
 # ============================================
 
-def get_agents() -> list:
-    """Get all agents."""
-    data = load_json(AGENTS_FILE)
-    return data.get("agents", [])
+# Parsed registries keyed by file path. Each entry holds the file signature
+# it was parsed from, the record list and a name -> record index. Readers
+# get the cached list and records themselves, not copies, so they must not
+# modify them (that would change what every later read sees, and renaming
+# a record would desync the index): copy a record before editing it, and
+# write changes through the store.
+_registry_cache = {}
 
 
-def get_agent(name: str) -> Optional[dict]:
-    """Get agent by name."""
-    agents = get_agents()
-    for agent in agents:
-        if agent.get("name") == name:
-            return agent
-    return None
+def _file_signature(filepath: Path) -> Optional[tuple]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
 
-def add_agent(name: str, description: str, files: list) -> dict:
-    """Add a new agent."""
-    data = load_json(AGENTS_FILE)
-    if "agents" not in data:
-        data["agents"] = []
+def _load_registry(filepath: Path, key: str) -> dict:
+    """Return the cache entry for a registry, re-parsing only if the file changed."""
+    filepath = Path(filepath)
+    signature = _file_signature(filepath)
+    entry = _registry_cache.get(filepath)
+    if entry is not None and entry["signature"] == signature:
+        return entry
     
-    # Check if agent already exists
-    for agent in data["agents"]:
-        if agent.get("name") == name:
-            raise ValueError(f"Agent '{name}' already exists")
+    items = load_json(filepath).get(key, []) if signature else []
+    index = {}
+    for item in items:
+        # First occurrence wins, matching the old linear scan
+        index.setdefault(item.get("name"), item)
     
-    new_agent = {
-        "name": name,
-        "description": description,
-        "files": files
-    }
-    data["agents"].append(new_agent)
-    save_json(AGENTS_FILE, data)
-    return new_agent
+    entry = {"signature": signature, "items": items, "index": index}
+    _registry_cache[filepath] = entry
+    return entry
 
 
-def remove_agent(name: str) -> bool:
-    """Remove an agent by name."""
-    data = load_json(AGENTS_FILE)
-    agents = data.get("agents", [])
-    
-    for i, agent in enumerate(agents):
-        if agent.get("name") == name:
-            del agents[i]
-            save_json(AGENTS_FILE, data)
-            return True
-    return False
+def get_registry_items(filepath: Path, key: str) -> list:
+    """Get all records of a registry file (cached per process; read-only)."""
+    return _load_registry(filepath, key)["items"]
 
 
-def get_agent_content(name: str) -> Optional[str]:
-    """Get the content of all files for an agent."""
-    agent = get_agent(name)
-    if not agent:
-        return None
-    
-    content_parts = []
-    for file_path in agent.get("files", []):
-        expanded = expand_path(file_path)
-        if expanded.exists():
-            with open(expanded, 'r', encoding='utf-8') as f:
-                content_parts.append(f"# File: {file_path}\n\n{f.read()}")
-        else:
-            content_parts.append(f"# File: {file_path}\n\n[FILE NOT FOUND]")
-    
-    return "\n\n---\n\n".join(content_parts)
+def get_registry_item(filepath: Path, key: str, name: str) -> Optional[dict]:
+    """Get a registry record by name in O(1) (cached per process; read-only)."""
+    return _load_registry(filepath, key)["index"].get(name)
+
+
+def invalidate_registry_cache(filepath: Optional[Path] = None) -> None:
+    """Drop cached registry data for one file, or for all files."""
+    if filepath is None:
+        _registry_cache.clear()
+    else:
+        _registry_cache.pop(Path(filepath), None)
 
 
 # ============================================
-# CONTEXTS
+# REGISTRY WRITES
 # ============================================
 
-def get_contexts() -> list:
-    """Get all contexts."""
-    data = load_json(CONTEXTS_FILE)
-    return data.get("contexts", [])
+# Writers hold an exclusive lock on a sidecar '.<registry>.lock' file for
+# the whole read-modify-write, so concurrent agenco processes cannot lose
+# each other's updates. Transactions nest within a thread: inner ones share
+# the outer one's data and only the outermost writes the file.
+_transactions = threading.local()
 
 
-def get_context(name: str) -> Optional[dict]:
-    """Get context by name."""
-    contexts = get_contexts()
-    for ctx in contexts:
-        if ctx.get("name") == name:
-            return ctx
-    return None
+def _lock_file(f) -> None:
+    """Block until an exclusive lock on an open file is held."""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
 
 
-def add_context(name: str, description: str, files: list) -> dict:
-    """Add a new context."""
-    data = load_json(CONTEXTS_FILE)
-    if "contexts" not in data:
-        data["contexts"] = []
+def _unlock_file(f) -> None:
+    """Release a lock taken with _lock_file."""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def registry_transaction(filepath: Path):
+    """
+    Lock a registry file and edit its data in place.
     
-    # Check if context already exists
-    for ctx in data["contexts"]:
-        if ctx.get("name") == name:
-            raise ValueError(f"Context '{name}' already exists")
+    Usage:
+        with registry_transaction(PROMPTS_FILE) as data:
+            data.setdefault("prompts", []).append(record)
     
-    new_context = {
-        "name": name,
-        "description": description,
-        "files": files
-    }
-    data["contexts"].append(new_context)
-    save_json(CONTEXTS_FILE, data)
-    return new_context
+    The file is re-read under the lock and, if the data changed, written
+    atomically once on exit. Nothing is written if the block raises. The
+    JSON store uses this for add/update/remove, so wrapping several of
+    them in one transaction costs a single write (see registry_batch for
+    the backend-independent form).
+    """
+    filepath = Path(filepath)
+    active = getattr(_transactions, "active", None)
+    if active is None:
+        active = _transactions.active = {}
+    if filepath in active:
+        yield active[filepath]
+        return
+    
+    with open(filepath.with_name(f".{filepath.name}.lock"), 'a+') as lock:
+        _lock_file(lock)
+        try:
+            data = load_json(filepath)
+            original = json.dumps(data, sort_keys=True)
+            active[filepath] = data
+            try:
+                yield data
+            finally:
+                del active[filepath]
+                getattr(_transactions, "indexes", {}).pop(filepath, None)
+            if json.dumps(data, sort_keys=True) != original:
+                save_json(filepath, data)
+        finally:
+            _unlock_file(lock)
 
 
-def remove_context(name: str) -> bool:
-    """Remove a context by name."""
-    data = load_json(CONTEXTS_FILE)
-    contexts = data.get("contexts", [])
+# ============================================
+# STORAGE BACKENDS
+# ============================================
+
+# Registries are read and written through a store. JsonStore keeps them in
+# agents.json, contexts.json and prompts.json (the default); SqliteStore
+# keeps them in one SQLite database with indexed names and full-text
+# search. The backend is chosen by AGENCO_STORAGE or the "storage" key in
+# ~/.agenco/config.json, which 'agenco migrate' sets. Records returned by
+# items() and get() may be cached and shared, so treat them as read-only.
+REGISTRY_KEYS = ("agents", "contexts", "prompts")
+SQLITE_FILE = Path(os.getenv("AGENCO_DB", str(BASE_DIR / "registry.db")))
+
+# Singular display names, for messages
+_RECORD_LABELS = {"agents": "Agent", "contexts": "Context", "prompts": "Prompt"}
+
+
+def _registry_files() -> tuple:
+    """Registry (key, file) pairs, resolved at call time."""
+    return (("agents", AGENTS_FILE), ("contexts", CONTEXTS_FILE), ("prompts", PROMPTS_FILE))
+
+
+class JsonStore:
+    """Registries stored as whole JSON documents, one file per registry."""
+    
+    name = "json"
+    full_text = False  # Search relies on the search index alone
+    
+    def _file(self, key: str) -> Path:
+        return dict(_registry_files())[key]
+    
+    def _name_index(self, filepath: Path, items: list) -> dict:
+        """Name -> position for items, kept for the current transaction."""
+        indexes = _transactions.__dict__.setdefault("indexes", {})
+        cached = indexes.get(filepath)
+        if cached is None or cached[0] is not items:
+            index = {}
+            for position, item in enumerate(items):
+                index.setdefault(item.get("name"), position)
+            cached = indexes[filepath] = (items, index)
+        return cached[1]
+    
+    def location(self) -> str:
+        return str(BASE_DIR)
+    
+    def items(self, key: str) -> list:
+        return get_registry_items(self._file(key), key)
     
-    for i, ctx in enumerate(contexts):
-        if ctx.get("name") == name:
-            del contexts[i]
-            save_json(CONTEXTS_FILE, data)
+    def get(self, key: str, name: str) -> Optional[dict]:
+        return get_registry_item(self._file(key), key, name)
+    
+    def signature(self, key: str) -> list:
+        """Changes whenever the registry changes."""
+        filepath = self._file(key)
+        return [str(filepath)] + list(_file_signature(filepath) or ())
+    
+    @contextmanager
+    def batch(self, key: str):
+        with registry_transaction(self._file(key)):
+            yield
+    
+    def put(self, key: str, record: dict, on_duplicate: str = "error") -> str:
+        """
+        Store a record. Returns 'added', 'replaced' or 'skipped'.
+        
+        on_duplicate is 'skip', 'replace' or 'error' (raise ValueError).
+        """
+        filepath = self._file(key)
+        with registry_transaction(filepath) as data:
+            items = data.setdefault(key, [])
+            index = self._name_index(filepath, items)
+            position = index.get(record["name"])
+            if position is None:
+                index[record["name"]] = len(items)
+                items.append(record)
+                return "added"
+            if on_duplicate == "replace":
+                items[position] = record
+                return "replaced"
+            if on_duplicate == "skip":
+                return "skipped"
+            raise ValueError(f"{_RECORD_LABELS[key]} '{record['name']}' already exists")
+    
+    def update(self, key: str, name: str, fields: dict) -> Optional[dict]:
+        filepath = self._file(key)
+        with registry_transaction(filepath) as data:
+            items = data.get(key, [])
+            position = self._name_index(filepath, items).get(name)
+            if position is None:
+                return None
+            items[position].update(fields)
+            return items[position]
+    
+    def remove(self, key: str, name: str) -> bool:
+        filepath = self._file(key)
+        with registry_transaction(filepath) as data:
+            items = data.get(key, [])
+            position = self._name_index(filepath, items).get(name)
+            if position is None:
+                return False
+            del items[position]
+            _transactions.indexes.pop(filepath, None)  # Positions shifted
             return True
-    return False
+    
+    def replace_all(self, key: str, records: list) -> None:
+        with registry_transaction(self._file(key)) as data:
+            data[key] = list(records)
 
 
-def get_context_content(name: str) -> Optional[str]:
-    """Get the content of all files for a context."""
-    ctx = get_context(name)
-    if not ctx:
-        return None
+class SqliteStore:
+    """
+    Registries stored in one SQLite database.
+    
+    Each record keeps its JSON in a 'records' table keyed by (kind, name),
+    with its position for registry order. An FTS5 trigram index over name,
+    description and prompt text (or file paths) answers substring search,
+    and WAL mode lets readers run alongside a writer.
+    """
+    
+    name = "sqlite"
+    full_text = True
     
-    content_parts = []
-    for file_path in ctx.get("files", []):
-        expanded = expand_path(file_path)
-        if expanded.exists():
-            with open(expanded, 'r', encoding='utf-8') as f:
-                content_parts.append(f"# File: {file_path}\n\n{f.read()}")
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS records (
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        description TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        data TEXT NOT NULL,
+        PRIMARY KEY (kind, name)
+    );
+    CREATE INDEX IF NOT EXISTS records_order ON records (kind, position);
+    CREATE TABLE IF NOT EXISTS versions (kind TEXT PRIMARY KEY, version INTEGER NOT NULL);
+    CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+        name, description, body, content='records', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+        INSERT INTO records_fts (rowid, name, description, body)
+            VALUES (new.rowid, new.name, new.description, new.body);
+        INSERT INTO versions VALUES (new.kind, 1)
+            ON CONFLICT (kind) DO UPDATE SET version = version + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+        INSERT INTO records_fts (records_fts, rowid, name, description, body)
+            VALUES ('delete', old.rowid, old.name, old.description, old.body);
+        INSERT INTO versions VALUES (old.kind, 1)
+            ON CONFLICT (kind) DO UPDATE SET version = version + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS records_au AFTER UPDATE ON records BEGIN
+        INSERT INTO records_fts (records_fts, rowid, name, description, body)
+            VALUES ('delete', old.rowid, old.name, old.description, old.body);
+        INSERT INTO records_fts (rowid, name, description, body)
+            VALUES (new.rowid, new.name, new.description, new.body);
+        INSERT INTO versions VALUES (new.kind, 1)
+            ON CONFLICT (kind) DO UPDATE SET version = version + 1;
+    END;
+    """
+    
+    def __init__(self, path: Path = None):
+        self.path = Path(path or SQLITE_FILE)
+        self._local = threading.local()
+        self._items = {}  # key -> (signature, parsed records)
+    
+    def _connect(self):
+        """Connection for the calling thread, created on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+    
+    @staticmethod
+    def _columns(key: str, record: dict) -> tuple:
+        body = record.get("prompt", "") if key == "prompts" else " ".join(record.get("files", []))
+        return record.get("description", "") or "", body or "", json.dumps(record, ensure_ascii=False)
+    
+    def location(self) -> str:
+        return str(self.path)
+    
+    def items(self, key: str) -> list:
+        """
+        Records in registry order, parsed again only when the registry changes.
+        
+        Like JsonStore's, the list is cached and shared: treat it as read-only.
+        """
+        signature = self.signature(key)
+        cached = self._items.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        rows = self._connect().execute(
+            "SELECT data FROM records WHERE kind = ? ORDER BY position", (key,)
+        )
+        items = [json.loads(data) for (data,) in rows]
+        if not self._local.depth:  # Writes in an open batch may still be rolled back
+            self._items[key] = (signature, items)
+        return items
+    
+    def get(self, key: str, name: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT data FROM records WHERE kind = ? AND name = ?", (key, name)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def signature(self, key: str) -> list:
+        row = self._connect().execute("SELECT version FROM versions WHERE kind = ?", (key,)).fetchone()
+        return [str(self.path), row[0] if row else 0]
+    
+    @contextmanager
+    def batch(self, key: str = None):
+        """Group writes into one transaction (nested batches join the outer one)."""
+        conn = self._connect()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
         else:
-            content_parts.append(f"# File: {file_path}\n\n[FILE NOT FOUND]")
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+    
+    def put(self, key: str, record: dict, on_duplicate: str = "error") -> str:
+        """
+        Store a record. Returns 'added', 'replaced' or 'skipped'.
+        
+        on_duplicate is 'skip', 'replace' or 'error' (raise ValueError).
+        """
+        conn = self._connect()
+        columns = self._columns(key, record)
+        with self.batch(key):
+            exists = conn.execute(
+                "SELECT 1 FROM records WHERE kind = ? AND name = ?", (key, record["name"])
+            ).fetchone()
+            if not exists:
+                conn.execute(
+                    "INSERT INTO records (kind, name, position, description, body, data) "
+                    "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM records WHERE kind = ?), ?, ?, ?)",
+                    (key, record["name"], key) + columns
+                )
+                return "added"
+            if on_duplicate == "replace":
+                conn.execute(
+                    "UPDATE records SET description = ?, body = ?, data = ? WHERE kind = ? AND name = ?",
+                    columns + (key, record["name"])
+                )
+                return "replaced"
+            if on_duplicate == "skip":
+                return "skipped"
+            raise ValueError(f"{_RECORD_LABELS[key]} '{record['name']}' already exists")
     
-    return "\n\n---\n\n".join(content_parts)
+    def update(self, key: str, name: str, fields: dict) -> Optional[dict]:
+        with self.batch(key):
+            record = self.get(key, name)
+            if record is None:
+                return None
+            record.update(fields)
+            self._connect().execute(
+                "UPDATE records SET description = ?, body = ?, data = ? WHERE kind = ? AND name = ?",
+                self._columns(key, record) + (key, name)
+            )
+            return record
+    
+    def remove(self, key: str, name: str) -> bool:
+        with self.batch(key):
+            cursor = self._connect().execute("DELETE FROM records WHERE kind = ? AND name = ?", (key, name))
+            return cursor.rowcount > 0
+    
+    def replace_all(self, key: str, records: list) -> None:
+        """Replace a registry's records. Later duplicates of a name are dropped."""
+        conn = self._connect()
+        with self.batch(key):
+            conn.execute("DELETE FROM records WHERE kind = ?", (key,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO records (kind, name, position, description, body, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((key, record.get("name", ""), position) + self._columns(key, record)
+                 for position, record in enumerate(records))
+            )
+    
+    def match_term(self, term: str) -> set:
+        """(kind, name) of records whose name, description or text contains term."""
+        if len(term) >= 3:
+            rows = self._connect().execute(
+                "SELECT r.kind, r.name FROM records_fts JOIN records r ON r.rowid = records_fts.rowid "
+                "WHERE records_fts MATCH ?",
+                ('"' + term.replace('"', '""') + '"',)
+            )
+        else:
+            # Trigrams need three characters; scan for shorter terms
+            rows = self._connect().execute(
+                "SELECT kind, name FROM records "
+                "WHERE instr(lower(name || ' ' || description || ' ' || body), ?) > 0",
+                (term,)
+            )
+        return set(rows)
 
 
-# ============================================
-# PROMPTS
-# ============================================
+STORAGE_BACKENDS = {"json": JsonStore, "sqlite": SqliteStore}
 
-def get_prompts() -> list:
-    """Get all prompts."""
-    data = load_json(PROMPTS_FILE)
-    return data.get("prompts", [])
+_store = None
 
 
-def get_prompt(name: str) -> Optional[dict]:
-    """Get prompt by name."""
-    prompts = get_prompts()
-    for prompt in prompts:
-        if prompt.get("name") == name:
-            return prompt
-    return None
+def get_store():
+    """Return the configured registry store (chosen once per process)."""
+    global _store
+    if _store is None:
+        backend = os.getenv("AGENCO_STORAGE")
+        if not backend:
+            try:
+                backend = get_config().get("storage", "json")
+            except (OSError, ValueError):
+                backend = "json"
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend} (use {', '.join(STORAGE_BACKENDS)})")
+        _store = STORAGE_BACKENDS[backend]()
+    return _store
 
 
-def add_prompt(name: str, description: str, prompt_text: str) -> dict:
-    """Add a new prompt."""
-    data = load_json(PROMPTS_FILE)
-    if "prompts" not in data:
-        data["prompts"] = []
+def registry_batch(key: str):
+    """
+    Group changes to one registry into a single write, whatever the backend.
+    
+        with registry_batch("prompts"):
+            for name, text in new_prompts:
+                add_prompt(name, "", text)
+    """
+    return get_store().batch(key)
+
+
+def migrate_storage(target: str) -> dict:
+    """
+    Copy every registry from the current backend to target and switch to it.
     
-    # Check if prompt already exists
-    for p in data["prompts"]:
-        if p.get("name") == name:
-            raise ValueError(f"Prompt '{name}' already exists")
+    Returns the number of records copied per registry.
+    """
+    if target not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {target} (use {', '.join(STORAGE_BACKENDS)})")
+    source = get_store()
+    if source.name == target:
+        raise ValueError(f"Registries are already stored in {target}")
     
-    new_prompt = {
-        "name": name,
-        "description": description,
-        "prompt": prompt_text
-    }
-    data["prompts"].append(new_prompt)
-    save_json(PROMPTS_FILE, data)
-    return new_prompt
+    destination = STORAGE_BACKENDS[target]()
+    counts = {}
+    for key in REGISTRY_KEYS:
+        records = source.items(key)
+        destination.replace_all(key, records)
+        counts[key] = len(destination.items(key))
+    
+    global _store
+    config = get_config()
+    config["storage"] = target
+    save_config(config)
+    _store = destination
+    return counts
 
 
-def update_prompt(name: str, description: Optional[str] = None, prompt_text: Optional[str] = None) -> Optional[dict]:
-    """Update an existing prompt."""
-    data = load_json(PROMPTS_FILE)
-    prompts = data.get("prompts", [])
-    
-    for prompt in prompts:
-        if prompt.get("name") == name:
-            if description is not None:
-                prompt["description"] = description
-            if prompt_text is not None:
-                prompt["prompt"] = prompt_text
-            save_json(PROMPTS_FILE, data)
-            return prompt
-    return None
+# ============================================
+# CONTENT CACHE
+# ============================================
 
+# Referenced files are cached as raw bytes in a bounded LRU keyed by
+# expanded path. An entry is used only while the file's (mtime, size) is
+# unchanged, so a hit costs one stat instead of a read. An optional disk
+# tier in ~/.agenco/cache/content/ helps when files live on slow network
+# mounts and the process is short-lived.
+CONTENT_CACHE_BYTES = int(float(os.getenv("AGENCO_CONTENT_CACHE_MB", "64")) * 1024 * 1024)
+CONTENT_CACHE_MAX_ENTRY = CONTENT_CACHE_BYTES // 8
+CONTENT_CACHE_DIR = CONFIG_DIR / "cache" / "content"
+DISK_CACHE_BYTES = int(float(os.getenv("AGENCO_DISK_CACHE_MB", "512")) * 1024 * 1024)
 
-def remove_prompt(name: str) -> bool:
-    """Remove a prompt by name."""
-    data = load_json(PROMPTS_FILE)
-    prompts = data.get("prompts", [])
-    
-    for i, prompt in enumerate(prompts):
-        if prompt.get("name") == name:
-            del prompts[i]
-            save_json(PROMPTS_FILE, data)
-            return True
-    return False
+_content_cache = None  # OrderedDict: path -> (signature, data)
+_content_cache_lock = threading.Lock()
+_content_cache_stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "bytes": 0}
+_disk_cache_writes = 0
 
 
-def get_prompt_content(name: str) -> Optional[str]:
-    """Get the prompt text for a prompt."""
-    prompt = get_prompt(name)
-    if not prompt:
+def _disk_cache_enabled() -> bool:
+    """Whether the on-disk tier is on (AGENCO_DISK_CACHE or config "disk_cache")."""
+    setting = os.getenv("AGENCO_DISK_CACHE")
+    if setting is not None:
+        return setting.lower() not in ("", "0", "false", "no")
+    try:
+        return bool(get_config().get("disk_cache", False))
+    except (OSError, ValueError):
+        return False
+
+
+def _disk_cache_file(path: str) -> Path:
+    import hashlib
+    return CONTENT_CACHE_DIR / hashlib.sha1(path.encode('utf-8')).hexdigest()
+
+
+def _disk_cache_get(path: str, signature: tuple) -> Optional[bytes]:
+    """Return cached bytes from disk if they were stored for this signature."""
+    try:
+        with open(_disk_cache_file(path), 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get("path") != path or tuple(header.get("signature", ())) != signature:
+                return None
+            return f.read()
+    except (OSError, ValueError):
         return None
-    return prompt.get("prompt", "")
 
 
-# ============================================
-# CLIPBOARD UTILITIES
-# ============================================
+def _disk_cache_put(path: str, signature: tuple, data: bytes) -> None:
+    """Store bytes on disk, pruning the oldest entries now and then."""
+    global _disk_cache_writes
+    try:
+        CONTENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = _disk_cache_file(path)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{threading.get_ident()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(json.dumps({"path": path, "signature": list(signature)}).encode('utf-8') + b"\n")
+            f.write(data)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        return  # The disk tier is best effort
+    
+    _disk_cache_writes += 1
+    if _disk_cache_writes % 64 == 0:
+        _prune_disk_cache()
 
-def copy_to_clipboard(text: str) -> bool:
-    """Copy text to system clipboard."""
-    import subprocess
-    import sys
+
+def _prune_disk_cache() -> None:
+    """Delete least recently written disk entries beyond DISK_CACHE_BYTES."""
+    try:
+        entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in os.scandir(CONTENT_CACHE_DIR)]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= DISK_CACHE_BYTES:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _cache_store(path: str, signature: tuple, data: bytes) -> None:
+    """Add an entry to the memory tier, evicting least recently used ones."""
+    if len(data) > CONTENT_CACHE_MAX_ENTRY:
+        return
+    with _content_cache_lock:
+        old = _content_cache.pop(path, None)
+        if old is not None:
+            _content_cache_stats["bytes"] -= len(old[1])
+        _content_cache[path] = (signature, data)
+        _content_cache_stats["bytes"] += len(data)
+        while _content_cache_stats["bytes"] > CONTENT_CACHE_BYTES:
+            _, (_, evicted) = _content_cache.popitem(last=False)
+            _content_cache_stats["bytes"] -= len(evicted)
+            _content_cache_stats["evictions"] += 1
+
+
+@traced("io")
+def read_file_bytes(path, max_bytes: Optional[int] = None) -> tuple:
+    """
+    Read a file through the content cache.
+    
+    Returns (data, size) where size is the full file size. With max_bytes,
+    at most that many bytes are returned; a file larger than that is read
+    only partially and is not cached. Raises OSError like open().
+    """
+    global _content_cache
+    from collections import OrderedDict
+    
+    path = str(path)
+    with _content_cache_lock:
+        if _content_cache is None:
+            _content_cache = OrderedDict()
+        cached = _content_cache.get(path)
+    
+    signature = _file_signature(path)
+    if signature is None:
+        raise FileNotFoundError(2, "No such file or directory", path)
+    
+    if cached is not None and cached[0] == signature:
+        with _content_cache_lock:
+            if path in _content_cache:
+                _content_cache.move_to_end(path)
+            _content_cache_stats["hits"] += 1
+        data = cached[1]
+        return (data if max_bytes is None else data[:max_bytes]), signature[1]
+    
+    disk = _disk_cache_enabled()
+    if disk:
+        data = _disk_cache_get(path, signature)
+        if data is not None:
+            with _content_cache_lock:
+                _content_cache_stats["disk_hits"] += 1
+            _cache_store(path, signature, data)
+            return (data if max_bytes is None else data[:max_bytes]), signature[1]
+    
+    with _content_cache_lock:
+        _content_cache_stats["misses"] += 1
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if max_bytes is not None and st.st_size > max_bytes:
+            return f.read(max_bytes), st.st_size
+        data = f.read()
     
+    signature = (st.st_mtime_ns, st.st_size)
+    if len(data) == st.st_size:  # Not modified while reading
+        _cache_store(path, signature, data)
+        if disk:
+            _disk_cache_put(path, signature, data)
+    return data, len(data)
+
+
+def get_content_cache_stats() -> dict:
+    """Hit/miss counters and sizes of the content cache tiers."""
+    with _content_cache_lock:
+        stats = dict(_content_cache_stats)
+        stats["entries"] = len(_content_cache or ())
+    stats["capacity"] = CONTENT_CACHE_BYTES
+    lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    
+    disk = {"enabled": _disk_cache_enabled(), "path": str(CONTENT_CACHE_DIR), "entries": 0, "bytes": 0}
     try:
-        if sys.platform == "darwin":  # macOS
-            process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
-            process.communicate(text.encode('utf-8'))
-            return process.returncode == 0
-        elif sys.platform == "linux":
-            process = subprocess.Popen(['xclip', '-selection', 'clipboard'], stdin=subprocess.PIPE)
-            process.communicate(text.encode('utf-8'))
-            return process.returncode == 0
-        elif sys.platform == "win32":
-            process = subprocess.Popen(['clip'], stdin=subprocess.PIPE, shell=True)
-            process.communicate(text.encode('utf-8'))
-            return process.returncode == 0
-    except Exception:
+        for entry in os.scandir(CONTENT_CACHE_DIR):
+            disk["entries"] += 1
+            disk["bytes"] += entry.stat().st_size
+    except OSError:
         pass
-    return False
+    stats["disk"] = disk
+    return stats
+
+
+def clear_content_cache(disk: bool = True) -> None:
+    """Empty the memory tier and, unless disk is False, the disk tier."""
+    with _content_cache_lock:
+        if _content_cache is not None:
+            _content_cache.clear()
+        _content_cache_stats["bytes"] = 0
+    if disk:
+        import shutil
+        shutil.rmtree(CONTENT_CACHE_DIR, ignore_errors=True)
 
 
 # ============================================
-# SEARCH
+# CONTENT LOADING
 # ============================================
 
-def search_all(query: str) -> dict:
-    """Search across agents, contexts, and prompts.
+# Referenced files are read on a shared, bounded thread pool. On
+# network-mounted home directories per-file latency dominates, so reading
+# files concurrently matters more than read throughput.
+CONTENT_MAX_WORKERS = int(os.getenv("AGENCO_IO_WORKERS", "8"))
+FILE_SEPARATOR = "\n\n---\n\n"
+
+_io_pool = None
+_io_pool_lock = threading.Lock()
+
+
+def _get_io_pool():
+    """Return the shared file I/O thread pool, creating it on first use."""
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _io_pool = ThreadPoolExecutor(
+                max_workers=max(1, CONTENT_MAX_WORKERS),
+                thread_name_prefix="agenco-io"
+            )
+        return _io_pool
+
+
+def map_concurrent(func, items: list, window: Optional[int] = None):
+    """Apply func to items on the I/O pool, yielding results in input order.
     
-    Searches in:
-    - Names and descriptions
-    - Content of files (for agents and contexts)
-    - Prompt text (for prompts)
+    At most `window` calls are in flight at once, so results are produced
+    progressively and memory stays bounded for long inputs. Exceptions
+    raised by func are re-raised when their result is reached.
     """
-    query = query.lower()
-    results = {
-        "agents": [],
-        "contexts": [],
-        "prompts": []
-    }
+    from collections import deque
     
-    # Search agents (name, description, AND file contents)
-    for agent in get_agents():
-        # Check name and description first
-        if query in agent.get("name", "").lower() or query in agent.get("description", "").lower():
-            results["agents"].append(agent)
-            continue
-        
-        # Also search in file contents
-        try:
-            content = get_agent_content(agent.get("name", ""))
-            if content and query in content.lower():
-                results["agents"].append(agent)
-        except Exception:
-            pass  # Skip if file not readable
-    
-    # Search contexts (name, description, AND file contents)
-    for ctx in get_contexts():
-        # Check name and description first
-        if query in ctx.get("name", "").lower() or query in ctx.get("description", "").lower():
-            results["contexts"].append(ctx)
-            continue
-        
-        # Also search in file contents
-        try:
-            content = get_context_content(ctx.get("name", ""))
-            if content and query in content.lower():
-                results["contexts"].append(ctx)
-        except Exception:
-            pass  # Skip if file not readable
-    
-    # Search prompts (name, description, AND prompt text)
-    for prompt in get_prompts():
-        if (query in prompt.get("name", "").lower() or 
-            query in prompt.get("description", "").lower() or
-            query in prompt.get("prompt", "").lower()):
-            results["prompts"].append(prompt)
+    items = list(items)
+    if len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
     
-    return results
+    pool = _get_io_pool()
+    window = window or max(1, CONTENT_MAX_WORKERS) * 2
+    pending = deque()
+    next_item = 0
+    try:
+        while pending or next_item < len(items):
+            while next_item < len(items) and len(pending) < window:
+                pending.append(pool.submit(func, items[next_item]))
+                next_item += 1
+            yield pending.popleft().result()
+    finally:
+        # Consumer stopped early: don't read files nobody will look at
+        for future in pending:
+            future.cancel()
 
 
-# ============================================
-# STATS
-# ============================================
+def read_file_part(file_path: str, max_file_bytes: Optional[int] = None) -> str:
+    """Read one referenced file as a '# File:' section.
+    
+    Missing files produce a [FILE NOT FOUND] section. With max_file_bytes,
+    only that many bytes are read and a truncation note is appended.
+    Files are read through the content cache.
+    """
+    expanded = expand_path(file_path)
+    try:
+        data, size = read_file_bytes(expanded, max_file_bytes)
+    except FileNotFoundError:
+        return f"# File: {file_path}\n\n[FILE NOT FOUND]"
+    
+    if max_file_bytes is None:
+        # Same text as reading in text mode (universal newlines)
+        text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        return f"# File: {file_path}\n\n{text}"
+    
+    # Drop a multi-byte character cut in half by the cap, but still fail on bad UTF-8
+    text = codecs.getincrementaldecoder('utf-8')().decode(data, final=size <= max_file_bytes)
+    if size > max_file_bytes:
+        text += f"\n\n[TRUNCATED: showing first {max_file_bytes} of {size} bytes]"
+    return f"# File: {file_path}\n\n{text}"
 
-def get_stats() -> dict:
+
+def iter_files_content(files: list, max_file_bytes: Optional[int] = None):
+    """Stream the '# File:' sections of files in order, reading ahead concurrently."""
+    return map_concurrent(lambda path: read_file_part(path, max_file_bytes), files)
+
+
+@traced("content")
+def load_files_content(files: list, max_file_bytes: Optional[int] = None) -> str:
+    """Read files concurrently and join their sections in the given order."""
+    return FILE_SEPARATOR.join(iter_files_content(files, max_file_bytes))
+
+
+@traced("content")
+def get_files_preview(files: list, max_chars: int = 500) -> dict:
+    """
+    Preview the start of the content files would produce, without reading them whole.
+    
+    Sections are built like load_files_content, but each file is read only
+    up to what max_chars still needs (a bounded read through the content
+    cache), and reading stops once max_chars is reached. Invalid UTF-8 is
+    replaced rather than raising.
+    
+    Returns:
+        dict with 'text' (at most max_chars characters), 'truncated' (more
+        content exists) and 'files', a list of {'path', 'size'} from stat,
+        with size None for missing files
+    """
+    def stat_size(file_path):
+        signature = _file_signature(expand_path(file_path))
+        return signature[1] if signature else None
+    
+    sizes = list(map_concurrent(stat_size, files))
+    parts = []
+    length = 0
+    truncated = False
+    for i, (file_path, size) in enumerate(zip(files, sizes)):
+        if length >= max_chars:
+            truncated = True
+            break
+        header = (FILE_SEPARATOR if i else "") + f"# File: {file_path}\n\n"
+        if size is None:
+            text = "[FILE NOT FOUND]"
+        else:
+            # UTF-8 uses at most 4 bytes per character
+            budget = max(0, max_chars - length - len(header)) * 4 + 4
+            try:
+                data, size = read_file_bytes(expand_path(file_path), budget)
+            except FileNotFoundError:
+                data, size = b"", None
+            text = data.decode('utf-8', errors='replace') if size is not None else "[FILE NOT FOUND]"
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+            if size is not None and size > len(data):
+                truncated = True
+        parts.append(header + text)
+        length += len(parts[-1])
+    
+    text = "".join(parts)
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+    return {
+        "text": text,
+        "truncated": truncated,
+        "files": [{"path": f, "size": size} for f, size in zip(files, sizes)],
+    }
+
+
+# Text is streamed in chunks of this many characters
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def iter_file_text(path, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Yield a text file's content in chunks; invalid UTF-8 is replaced."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_bundle_text(entries: list, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Stream '# File:' sections joined by FILE_SEPARATOR without building the bundle.
+    
+    Args:
+        entries: (label, path) pairs; missing files become [FILE NOT FOUND]
+    """
+    for i, (label, path) in enumerate(entries):
+        if i:
+            yield FILE_SEPARATOR
+        yield f"# File: {label}\n\n"
+        try:
+            yield from iter_file_text(path, chunk_size)
+        except FileNotFoundError:
+            yield "[FILE NOT FOUND]"
+
+
+# ============================================
+# AGENTS
+# ============================================
+
+def get_agents() -> list:
+    """Get all agents (shared with the registry cache; don't modify them)."""
+    return get_store().items("agents")
+
+
+def get_agent(name: str) -> Optional[dict]:
+    """Get agent by name (may be shared with the registry cache; don't modify it)."""
+    return get_store().get("agents", name)
+
+
+def add_agent(name: str, description: str, files: list) -> dict:
+    """Add a new agent."""
+    new_agent = {
+        "name": name,
+        "description": description,
+        "files": files
+    }
+    get_store().put("agents", new_agent)
+    return new_agent
+
+
+def remove_agent(name: str) -> bool:
+    """Remove an agent by name."""
+    return get_store().remove("agents", name)
+
+
+@traced("content")
+def get_agent_content(name: str, max_file_bytes: Optional[int] = None) -> Optional[str]:
+    """Get the content of all files for an agent."""
+    agent = get_agent(name)
+    if not agent:
+        return None
+    return load_files_content(agent.get("files", []), max_file_bytes)
+
+
+@traced("content")
+def get_agent_preview(name: str, max_chars: int = 500) -> Optional[dict]:
+    """Preview an agent's content and file sizes (see get_files_preview)."""
+    agent = get_agent(name)
+    if not agent:
+        return None
+    return get_files_preview(agent.get("files", []), max_chars)
+
+
+# ============================================
+# CONTEXTS
+# ============================================
+
+def get_contexts() -> list:
+    """Get all contexts (shared with the registry cache; don't modify them)."""
+    return get_store().items("contexts")
+
+
+def get_context(name: str) -> Optional[dict]:
+    """Get context by name (may be shared with the registry cache; don't modify it)."""
+    return get_store().get("contexts", name)
+
+
+def add_context(name: str, description: str, files: list) -> dict:
+    """Add a new context."""
+    new_context = {
+        "name": name,
+        "description": description,
+        "files": files
+    }
+    get_store().put("contexts", new_context)
+    return new_context
+
+
+def remove_context(name: str) -> bool:
+    """Remove a context by name."""
+    return get_store().remove("contexts", name)
+
+
+@traced("content")
+def get_context_content(name: str, max_file_bytes: Optional[int] = None) -> Optional[str]:
+    """Get the content of all files for a context."""
+    ctx = get_context(name)
+    if not ctx:
+        return None
+    return load_files_content(ctx.get("files", []), max_file_bytes)
+
+
+@traced("content")
+def get_context_preview(name: str, max_chars: int = 500) -> Optional[dict]:
+    """Preview a context's content and file sizes (see get_files_preview)."""
+    ctx = get_context(name)
+    if not ctx:
+        return None
+    return get_files_preview(ctx.get("files", []), max_chars)
+
+
+def iter_context_content(name: str):
+    """Stream the content of all files for a context, in chunks.
+    
+    Yields the same text get_context_content returns, without holding it
+    in memory (invalid UTF-8 is replaced instead of raising).
+    """
+    ctx = get_context(name)
+    if not ctx:
+        return
+    entries = [(file_path, expand_path(file_path)) for file_path in ctx.get("files", [])]
+    yield from iter_bundle_text(entries)
+
+
+# ============================================
+# PROMPTS
+# ============================================
+
+def get_prompts() -> list:
+    """Get all prompts (shared with the registry cache; don't modify them)."""
+    return get_store().items("prompts")
+
+
+def get_prompt(name: str) -> Optional[dict]:
+    """Get prompt by name (may be shared with the registry cache; don't modify it)."""
+    return get_store().get("prompts", name)
+
+
+def add_prompt(name: str, description: str, prompt_text: str) -> dict:
+    """Add a new prompt."""
+    new_prompt = {
+        "name": name,
+        "description": description,
+        "prompt": prompt_text
+    }
+    get_store().put("prompts", new_prompt)
+    return new_prompt
+
+
+def update_prompt(name: str, description: Optional[str] = None, prompt_text: Optional[str] = None) -> Optional[dict]:
+    """Update an existing prompt."""
+    fields = {}
+    if description is not None:
+        fields["description"] = description
+    if prompt_text is not None:
+        fields["prompt"] = prompt_text
+    return get_store().update("prompts", name, fields)
+
+
+def remove_prompt(name: str) -> bool:
+    """Remove a prompt by name."""
+    return get_store().remove("prompts", name)
+
+
+@traced("content")
+def get_prompt_content(name: str) -> Optional[str]:
+    """Get the prompt text for a prompt."""
+    prompt = get_prompt(name)
+    if not prompt:
+        return None
+    return prompt.get("prompt", "")
+
+
+# ============================================
+# CLIPBOARD UTILITIES
+# ============================================
+
+# The clipboard backend is detected once per process: AGENCO_CLIPBOARD or
+# the "clipboard" config key if set, OSC 52 in SSH sessions (so the copy
+# lands on the machine you are sitting at), then the platform's clipboard
+# tool, then OSC 52 on any terminal. Text is written in chunks, so large
+# contexts are never encoded into one big bytes object.
+CLIPBOARD_CHUNK_SIZE = 64 * 1024
+CLIPBOARD_COMMANDS = {
+    "pbcopy": ["pbcopy"],
+    "wl-copy": ["wl-copy"],
+    "xclip": ["xclip", "-selection", "clipboard"],
+    "xsel": ["xsel", "--clipboard", "--input"],
+    "clip": ["clip"],
+}
+# Larger OSC 52 copies are refused rather than sent: many terminals and
+# tmux silently drop or truncate big ones
+OSC52_MAX_BYTES = int(os.getenv("AGENCO_OSC52_MAX", str(100 * 1024)))
+
+
+def _iter_chunks(content, chunk_size: int = CLIPBOARD_CHUNK_SIZE):
+    """Yield a string in slices, or the chunks of an iterable of strings."""
+    if isinstance(content, str):
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+    else:
+        yield from content
+
+
+class CommandClipboard:
+    """Pipes text into a clipboard tool (pbcopy, wl-copy, xclip, xsel, clip)."""
+    
+    def __init__(self, name: str, argv: list):
+        self.name = name
+        self.argv = argv
+    
+    def copy(self, content) -> bool:
+        import subprocess
+        
+        process = subprocess.Popen(self.argv, stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for chunk in _iter_chunks(content):
+                process.stdin.write(chunk.encode('utf-8'))
+            process.stdin.close()
+        except BrokenPipeError:
+            process.kill()
+            process.wait()
+            return False
+        return process.wait() == 0
+
+
+class Osc52Clipboard:
+    """
+    Sets the clipboard of the terminal emulator with an OSC 52 escape
+    sequence, which works through SSH and (with passthrough) tmux. Some
+    terminals cap the size they accept or need OSC 52 enabled, so text
+    over OSC52_MAX_BYTES is refused, with the reason in .error.
+    """
+    
+    name = "osc52"
+    error = None
+    
+    def copy(self, content) -> bool:
+        import base64
+        
+        self.error = None
+        data = []
+        size = 0
+        for chunk in _iter_chunks(content):
+            data.append(chunk.encode('utf-8'))
+            size += len(data[-1])
+            if size > OSC52_MAX_BYTES:
+                self.error = (f"text is over the {format_size(OSC52_MAX_BYTES)} terminals reliably accept "
+                              f"through OSC 52 (AGENCO_OSC52_MAX); use --stdout and pipe it instead")
+                return False
+        
+        if os.getenv("TMUX"):
+            start, end = b"\x1bPtmux;\x1b\x1b]52;c;", b"\x07\x1b\\"
+        else:
+            start, end = b"\x1b]52;c;", b"\x07"
+        with _open_terminal() as terminal:
+            terminal.write(start + base64.b64encode(b"".join(data)) + end)
+        return True
+
+
+class StdoutClipboard:
+    """Writes text to standard output, for piping into other commands."""
+    
+    name = "stdout"
+    
+    def copy(self, content) -> bool:
+        import sys
+        
+        for chunk in _iter_chunks(content):
+            sys.stdout.write(chunk)
+        sys.stdout.flush()
+        return True
+
+
+def _open_terminal():
+    """The controlling terminal, opened for writing bytes."""
+    import sys
+    
+    try:
+        return open("/dev/tty", "wb", buffering=0)
+    except OSError:
+        if sys.stdout.isatty():
+            return open(sys.stdout.fileno(), "wb", buffering=0, closefd=False)
+        raise
+
+
+def _has_terminal() -> bool:
+    try:
+        _open_terminal().close()
+        return True
+    except OSError:
+        return False
+
+
+def clipboard_backend(name: str):
+    """A clipboard backend by name (a CLIPBOARD_COMMANDS tool, 'osc52' or 'stdout')."""
+    if name == "osc52":
+        return Osc52Clipboard()
+    if name == "stdout":
+        return StdoutClipboard()
+    if name in CLIPBOARD_COMMANDS:
+        return CommandClipboard(name, CLIPBOARD_COMMANDS[name])
+    raise ValueError(f"Unknown clipboard '{name}' (use {', '.join(CLIPBOARD_COMMANDS)}, osc52 or stdout)")
+
+
+def detect_clipboard():
+    """The best available clipboard backend, or None."""
+    import shutil
+    import sys
+    
+    setting = os.getenv("AGENCO_CLIPBOARD") or get_config().get("clipboard")
+    if setting:
+        return clipboard_backend(setting)
+    
+    if (os.getenv("SSH_TTY") or os.getenv("SSH_CONNECTION")) and _has_terminal():
+        return Osc52Clipboard()
+    
+    if sys.platform == "darwin":
+        candidates = ["pbcopy"]
+    elif sys.platform == "win32":
+        candidates = ["clip"]
+    else:
+        candidates = []
+        if os.getenv("WAYLAND_DISPLAY"):
+            candidates.append("wl-copy")
+        if os.getenv("DISPLAY"):
+            candidates.extend(["xclip", "xsel"])
+    for name in candidates:
+        if shutil.which(CLIPBOARD_COMMANDS[name][0]):
+            return clipboard_backend(name)
+    
+    if _has_terminal():
+        return Osc52Clipboard()
+    return None
+
+
+_clipboard = None
+_clipboard_detected = False
+
+
+def get_clipboard():
+    """The clipboard backend for this process, detected on first use."""
+    global _clipboard, _clipboard_detected
+    if not _clipboard_detected:
+        _clipboard = detect_clipboard()
+        _clipboard_detected = True
+    return _clipboard
+
+
+@traced("io")
+def copy_to_clipboard(content, backend: Optional[str] = None) -> bool:
+    """
+    Copy text to the clipboard.
+    
+    Args:
+        content: A string, or an iterable of string chunks (e.g.
+            iter_context_content) to copy without building the whole text
+        backend: Backend name to use instead of the detected one
+            ('stdout' writes the text to standard output)
+    
+    Returns:
+        Whether the text was handed to the clipboard
+    """
+    import subprocess
+    
+    try:
+        clipboard = clipboard_backend(backend) if backend else get_clipboard()
+        if clipboard is None:
+            return False
+        return clipboard.copy(content)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return False
+
+
+# ============================================
+# SEARCH
+# ============================================
+
+# The index lives under ~/.agenco/index/ and is updated incrementally:
+# registry records are re-tokenized when their registry changes, and
+# referenced files are re-read only when their mtime or size changes.
+# Stores with full-text search of their own (SQLite) answer for names,
+# descriptions and prompt text, and the index covers referenced files.
+INDEX_DIR = CONFIG_DIR / "index"
+INDEX_FILE = INDEX_DIR / "search.json"
+INDEX_VERSION = 2
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# On-disk index loaded once per process, plus postings derived from it
+_search_index = None
+_search_postings = None
+_search_docs = None
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _term_counts(text: str) -> dict:
+    """Count occurrences of each token in text."""
+    counts = {}
+    for term in tokenize(text):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def _load_search_index() -> dict:
+    """Load the on-disk search index (once per process)."""
+    global _search_index
+    if _search_index is None:
+        try:
+            data = load_json(INDEX_FILE)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") != INDEX_VERSION:
+            data = {"version": INDEX_VERSION, "registries": {}, "files": {}}
+        _search_index = data
+    return _search_index
+
+
+def _save_search_index(index: dict) -> None:
+    """Write the search index compactly, replacing the old file atomically.
+    
+    Each writer uses its own temp file, since the daemon and CLI processes
+    may rebuild the index at the same time.
+    """
+    import tempfile
+    
+    tmp_path = None
+    try:
+        INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=INDEX_DIR, prefix=f".{INDEX_FILE.name}.", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, INDEX_FILE)
+    except OSError:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        # Index is only a cache; search still works in memory
+
+
+def _index_record(key: str, record: dict, with_fields: bool = True) -> dict:
+    """Build the index document for a registry record."""
+    fields = {}
+    if with_fields:
+        fields["name"] = _term_counts(record.get("name", ""))
+        fields["description"] = _term_counts(record.get("description", ""))
+        if key == "prompts":
+            fields["prompt"] = _term_counts(record.get("prompt", ""))
+        else:
+            fields["paths"] = _term_counts(" ".join(record.get("files", [])))
+    
+    return {
+        "name": record.get("name", ""),
+        "fields": fields,
+        "files": [str(expand_path(p)) for p in record.get("files", [])],
+    }
+
+
+def _index_file(path: str, signature: Optional[list]) -> dict:
+    """Build the index entry for a referenced file."""
+    entry = {"signature": signature, "terms": {}}
+    if signature is not None:
+        try:
+            data, _ = read_file_bytes(path)
+            entry["terms"] = _term_counts(data.decode('utf-8'))
+        except (OSError, UnicodeDecodeError):
+            pass  # Unreadable files are indexed as empty until they change
+    return entry
+
+
+@traced("search")
+def update_search_index() -> dict:
+    """Bring the search index up to date with the registries and their files.
+    
+    Returns:
+        dict with counts of 'registries' and 'files' re-indexed and
+        'removed' files no longer referenced
+    """
+    global _search_postings, _search_docs
+    index = _load_search_index()
+    store = get_store()
+    stats = {"registries": 0, "files": 0, "removed": 0}
+    referenced = set()
+    
+    for key in REGISTRY_KEYS:
+        signature = store.signature(key)
+        entry = index["registries"].get(key)
+        if entry is None or entry["signature"] != signature:
+            entry = {
+                "signature": signature,
+                "docs": [_index_record(key, r, not store.full_text) for r in store.items(key)],
+            }
+            index["registries"][key] = entry
+            stats["registries"] += 1
+        for doc in entry["docs"]:
+            referenced.update(doc["files"])
+    
+    files = index["files"]
+    changed = []
+    for path in referenced:
+        signature = _file_signature(path)
+        signature = list(signature) if signature else None
+        cached = files.get(path)
+        if cached is None or cached["signature"] != signature:
+            changed.append((path, signature))
+    
+    for (path, _), entry in zip(changed, map_concurrent(lambda c: _index_file(*c), changed)):
+        files[path] = entry
+    stats["files"] = len(changed)
+    
+    for path in [p for p in files if p not in referenced]:
+        del files[path]
+        stats["removed"] += 1
+    
+    if any(stats.values()):
+        _search_postings = None
+        _search_docs = None
+        _file_lengths.clear()
+        _save_search_index(index)
+    return stats
+
+
+def rebuild_search_index() -> dict:
+    """Discard the search index and build it from scratch."""
+    global _search_index, _search_postings, _search_docs
+    _search_index = {"version": INDEX_VERSION, "registries": {}, "files": {}}
+    _search_postings = None
+    _search_docs = None
+    _file_lengths.clear()
+    return update_search_index()
+
+
+def get_search_index_status() -> dict:
+    """Describe the search index without updating it."""
+    index = _load_search_index()
+    
+    stale = 0
+    for path, entry in index["files"].items():
+        signature = _file_signature(path)
+        if (list(signature) if signature else None) != entry["signature"]:
+            stale += 1
+    store = get_store()
+    for key in REGISTRY_KEYS:
+        entry = index["registries"].get(key)
+        if entry is None or entry["signature"] != store.signature(key):
+            stale += 1
+    
+    terms = set()
+    for entry in index["files"].values():
+        terms.update(entry["terms"])
+    for entry in index["registries"].values():
+        for doc in entry["docs"]:
+            for counts in doc["fields"].values():
+                terms.update(counts)
+    
+    return {
+        "path": str(INDEX_FILE),
+        "exists": INDEX_FILE.exists(),
+        "size": INDEX_FILE.stat().st_size if INDEX_FILE.exists() else 0,
+        "resources": {key: len(entry["docs"]) for key, entry in index["registries"].items()},
+        "files": len(index["files"]),
+        "terms": len(terms),
+        "stale": stale,
+    }
+
+
+def _get_search_postings() -> dict:
+    """Map each indexed term to the (registry key, position) of documents containing it."""
+    global _search_postings
+    if _search_postings is None:
+        index = _load_search_index()
+        postings = {}
+        for key, entry in index["registries"].items():
+            for position, doc in enumerate(entry["docs"]):
+                doc_id = (key, position)
+                for counts in doc["fields"].values():
+                    for term in counts:
+                        postings.setdefault(term, set()).add(doc_id)
+                for path in doc["files"]:
+                    for term in index["files"].get(path, {}).get("terms", {}):
+                        postings.setdefault(term, set()).add(doc_id)
+        _search_postings = postings
+    return _search_postings
+
+
+@traced("search")
+def search_all(query: str) -> dict:
+    """Search across agents, contexts, and prompts.
+    
+    Searches in:
+    - Names and descriptions
+    - Content of files (for agents and contexts)
+    - Prompt text (for prompts)
+    
+    Answers come from the persistent search index. A resource matches when
+    every word of the query appears (as a substring of an indexed word)
+    somewhere in it.
+    """
+    results = {
+        "agents": [],
+        "contexts": [],
+        "prompts": []
+    }
+    
+    store = get_store()
+    terms = tokenize(query)
+    if not terms:
+        # Nothing indexable (e.g. punctuation only): match names and descriptions
+        query = query.lower()
+        for key in REGISTRY_KEYS:
+            for item in store.items(key):
+                if query in item.get("name", "").lower() or query in item.get("description", "").lower():
+                    results[key].append(item)
+        return results
+    
+    update_search_index()
+    postings = _get_search_postings()
+    index = _load_search_index()
+    if store.full_text:
+        doc_ids = {
+            (key, doc["name"]): (key, position)
+            for key, entry in index["registries"].items()
+            for position, doc in enumerate(entry["docs"])
+        }
+    
+    matches = None
+    for term in terms:
+        docs = set()
+        for indexed_term, ids in postings.items():
+            if term in indexed_term:
+                docs |= ids
+        if store.full_text:
+            docs |= {doc_ids[match] for match in store.match_term(term) if match in doc_ids}
+        matches = docs if matches is None else matches & docs
+        if not matches:
+            return results
+    
+    # Report matches in registry order
+    for key in REGISTRY_KEYS:
+        docs = index["registries"][key]["docs"]
+        for position in sorted(p for k, p in matches if k == key):
+            item = store.get(key, docs[position]["name"])
+            if item is not None:
+                results[key].append(item)
+    
+    return results
+
+
+# Ranked search scores resources with BM25F over their fields. Query words
+# match indexed words exactly, as a prefix or as a substring, with falling
+# weight; words of four or more letters also match resource names within a
+# small edit distance, so typos still find them.
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "description": 2.0, "text": 1.0, "files": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+_MATCH_WEIGHTS = {"exact": 1.0, "prefix": 0.7, "substring": 0.4, "fuzzy": 0.5}
+SNIPPET_WIDTH = 120
+
+# Per-file word counts in the index, cached with the postings
+_file_lengths = {}
+
+
+def parse_search_query(query: str) -> dict:
+    """
+    Parse a search query into OR-groups of AND-ed terms and type filters.
+    
+    'review bug' needs both words, 'review OR bug' (or '|') either, and
+    'type:prompt' or 'type:agent,context' restricts the resource types.
+    """
+    groups = [[]]
+    types = set()
+    for word in query.split():
+        if word in ("OR", "|"):
+            if groups[-1]:
+                groups.append([])
+        elif word == "AND":
+            continue
+        elif word.lower().startswith("type:"):
+            for name in filter(None, word[5:].lower().split(",")):
+                key = RECORD_TYPES.get(name, name)
+                if key not in REGISTRY_KEYS:
+                    raise ValueError(f"Unknown type '{name}' (use agent, context or prompt)")
+                types.add(key)
+        else:
+            groups[-1].extend(tokenize(word))
+    return {"groups": [group for group in groups if group], "types": types}
+
+
+def _match_kind(term: str, word: str) -> Optional[str]:
+    """How a query term matches an indexed word, if at all."""
+    if term == word:
+        return "exact"
+    if word.startswith(term):
+        return "prefix"
+    if term in word:
+        return "substring"
+    return None
+
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """Whether a and b are within limit edits (insert, delete, substitute, transpose)."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    # Each edit adds or removes at most two distinct characters: a cheap
+    # rejection before the full comparison
+    if len(set(a).symmetric_difference(b)) > 2 * limit:
+        return False
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return False
+        previous2, previous = previous, current
+    return previous[-1] <= limit
+
+
+def _term_frequency(term: str, counts: dict, expansion: Optional[dict], fuzzy: dict = None) -> float:
+    """Weighted occurrences of a query term among a field's word counts."""
+    tf = 0.0
+    if expansion is not None and len(expansion) < len(counts):
+        for word, weight in expansion.items():
+            if word in counts:
+                tf += counts[word] * weight
+    else:
+        for word, count in counts.items():
+            kind = _match_kind(term, word)
+            if kind:
+                tf += count * _MATCH_WEIGHTS[kind]
+    for word in fuzzy or ():
+        tf += counts.get(word, 0) * _MATCH_WEIGHTS["fuzzy"]
+    return tf
+
+
+def _doc_fields(key: str, doc: dict, store) -> dict:
+    """Word counts per ranking field for an index document."""
+    fields = doc["fields"]
+    if not fields:
+        # Store with its own full-text search: tokenize the record on demand
+        record = store.get(key, doc["name"])
+        fields = _index_record(key, record or {"name": doc["name"]})["fields"]
+    return {
+        "name": fields.get("name", {}),
+        "description": fields.get("description", {}),
+        "text": fields.get("prompt") or fields.get("paths") or {},
+    }
+
+
+def _snippet(text: str, patterns: list) -> Optional[str]:
+    """A window of text around the first match of any pattern, whitespace collapsed."""
+    best = None
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match and (best is None or match.start() < best.start()):
+            best = match
+    if best is None:
+        return None
+    start = max(0, best.start() - SNIPPET_WIDTH // 3)
+    snippet = " ".join(text[start:start + SNIPPET_WIDTH].split())
+    return ("…" if start else "") + snippet + ("…" if start + SNIPPET_WIDTH < len(text) else "")
+
+
+def _result_snippet(key: str, item: dict, doc: dict, terms: list) -> tuple:
+    """(field, snippet) showing where a result matched."""
+    patterns = [re.compile(re.escape(term), re.IGNORECASE) for term in terms]
+    candidates = [("description", item.get("description", ""))]
+    if key == "prompts":
+        candidates.append(("prompt", item.get("prompt", "")))
+    for field, text in candidates:
+        snippet = _snippet(text or "", patterns)
+        if snippet:
+            return field, snippet
+    for path in doc["files"]:
+        try:
+            data, _ = read_file_bytes(path, 1024 * 1024)
+        except OSError:
+            continue
+        snippet = _snippet(data.decode('utf-8', errors='replace'), patterns)
+        if snippet:
+            return path, snippet
+    return "name", " ".join((item.get("description") or "")[:SNIPPET_WIDTH].split())
+
+
+def _get_search_docs() -> tuple:
+    """
+    Index documents by (key, position) and by (key, name), name words ->
+    documents, and caches of typo matches per term and field lengths per
+    document. Rebuilt whenever the index changes.
+    """
+    global _search_docs
+    if _search_docs is None:
+        index = _load_search_index()
+        docs = {
+            (key, position): doc
+            for key, entry in index["registries"].items()
+            for position, doc in enumerate(entry["docs"])
+        }
+        by_name = {(doc_id[0], doc["name"]): doc_id for doc_id, doc in docs.items()}
+        
+        # Words of resource names, for typo-tolerant matching
+        name_words = {}
+        for doc_id, doc in docs.items():
+            for word in tokenize(doc["name"]):
+                name_words.setdefault(word, set()).add(doc_id)
+        _search_docs = (docs, by_name, name_words, {}, {})
+    return _search_docs
+
+
+@traced("search")
+def search_ranked(query: str, limit: Optional[int] = 20, refresh: bool = True, snippets: bool = True) -> list:
+    """
+    Search across agents, contexts, and prompts, best matches first.
+    
+    Query syntax: words are AND-ed, 'OR' (or '|') separates alternatives,
+    and 'type:agent,prompt' filters by type. Each word matches indexed words
+    it equals, prefixes or is contained in, and (four letters or more)
+    names within one or two typos.
+    
+    Pass refresh=False to skip bringing the index up to date first (for
+    as-you-type search, which refreshes once up front), and snippets=False
+    to skip reading snippets (match and snippet are then empty).
+    
+    Returns:
+        Up to limit dicts with 'type' ('agent', 'context' or 'prompt'),
+        'name', 'score', 'match' (field or file the snippet is from),
+        'snippet' and 'item' (the registry record)
+    """
+    import heapq
+    
+    parsed = parse_search_query(query)
+    store = get_store()
+    keys = [key for key in REGISTRY_KEYS if not parsed["types"] or key in parsed["types"]]
+    types = {key: record_type for record_type, key in RECORD_TYPES.items()}
+    
+    def result(key, item, score, match, snippet):
+        return {"type": types[key], "name": item.get("name", ""), "score": round(score, 4),
+                "match": match, "snippet": snippet, "item": item}
+    
+    if not parsed["groups"]:
+        # No words: list the selected types, or match punctuation in names and descriptions
+        text = " ".join(w for w in query.split() if not w.lower().startswith("type:")).lower()
+        if tokenize(text) or (not text and not parsed["types"]):
+            return []
+        results = []
+        for key in keys:
+            for item in store.items(key):
+                if not text or text in item.get("name", "").lower() or text in item.get("description", "").lower():
+                    results.append(result(key, item, 0.0, "name", item.get("description", "")))
+        return results[:limit] if limit else results
+    
+    if refresh:
+        update_search_index()
+    postings = _get_search_postings()
+    index = _load_search_index()
+    docs, by_name, name_words, fuzzy_cache, length_cache = _get_search_docs()
+    
+    terms = list(dict.fromkeys(term for group in parsed["groups"] for term in group))
+    expansions, fuzzy, candidates = {}, {}, {}
+    for term in terms:
+        expansion = {}
+        matched = set()
+        for word, ids in postings.items():
+            kind = _match_kind(term, word)
+            if kind:
+                expansion[word] = _MATCH_WEIGHTS[kind]
+                matched |= ids
+        if store.full_text:
+            matched |= {by_name[m] for m in store.match_term(term) if m in by_name}
+        if term not in fuzzy_cache:
+            fuzzy_cache[term] = set()
+            if len(term) >= 4:
+                limit_edits = 2 if len(term) >= 8 else 1
+                fuzzy_cache[term] = {
+                    word for word in name_words
+                    if not _match_kind(term, word) and _within_distance(term, word, limit_edits)
+                }
+        fuzzy[term] = fuzzy_cache[term]
+        for word in fuzzy[term]:
+            matched |= name_words[word]
+        expansions[term] = None if store.full_text else expansion
+        candidates[term] = matched
+    
+    # Documents matching every word of at least one group
+    matched_terms = {}
+    for group in parsed["groups"]:
+        group_docs = set.intersection(*(candidates[term] for term in group))
+        for doc_id in group_docs:
+            if doc_id[0] in keys:
+                matched_terms.setdefault(doc_id, set()).update(group)
+    if not matched_terms:
+        return []
+    
+    # Field lengths for BM25 length normalization
+    files = index["files"]
+    for path, entry in files.items():
+        if path not in _file_lengths:
+            _file_lengths[path] = sum(entry["terms"].values())
+    fields = {doc_id: _doc_fields(doc_id[0], docs[doc_id], store) for doc_id in matched_terms}
+    for doc_id in matched_terms:
+        if doc_id not in length_cache:
+            length_cache[doc_id] = dict(
+                {field: sum(counts.values()) for field, counts in fields[doc_id].items()},
+                files=sum(_file_lengths.get(path, 0) for path in docs[doc_id]["files"])
+            )
+    lengths = {doc_id: length_cache[doc_id] for doc_id in matched_terms}
+    averages = {
+        field: max(1.0, sum(length[field] for length in lengths.values()) / len(lengths))
+        for field in SEARCH_FIELD_WEIGHTS
+    }
+    total_docs = len(docs)
+    idfs = {
+        term: math.log(1 + (total_docs - len(candidates[term]) + 0.5) / (len(candidates[term]) + 0.5))
+        for term in terms
+    }
+    
+    scored = []
+    for doc_id, doc_terms in matched_terms.items():
+        doc = docs[doc_id]
+        score = 0.0
+        for term in doc_terms:
+            tf = 0.0
+            for field, weight in SEARCH_FIELD_WEIGHTS.items():
+                if field == "files":
+                    if not doc["files"]:
+                        continue
+                    raw = sum(_term_frequency(term, files.get(path, {}).get("terms", {}), expansions[term])
+                              for path in doc["files"])
+                else:
+                    raw = _term_frequency(term, fields[doc_id][field], expansions[term],
+                                          fuzzy[term] if field == "name" else None)
+                if raw:
+                    norm = 1 - BM25_B + BM25_B * lengths[doc_id][field] / averages[field]
+                    tf += weight * raw / norm
+            score += idfs[term] * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+        scored.append((-score, doc_id))
+    scored = heapq.nsmallest(limit, scored) if limit else sorted(scored)
+    
+    results = []
+    for neg_score, (key, position) in scored:
+        doc = docs[(key, position)]
+        item = store.get(key, doc["name"])
+        if item is None:
+            continue
+        match, snippet = "", ""
+        if snippets:
+            match, snippet = _result_snippet(key, item, doc, sorted(matched_terms[(key, position)], key=len, reverse=True))
+        results.append(result(key, item, -neg_score, match, snippet))
+    return results
+
+
+SEARCH_CHUNK_SIZE = 64 * 1024
+
+
+def _scan_file(path: str, terms: set, done=None, chunk_size: int = SEARCH_CHUNK_SIZE) -> tuple:
+    """
+    Look for terms in a file chunk by chunk, stopping once all are found
+    (or once done(found) is true).
+    
+    Returns:
+        (terms found, snippet around the first match or None)
+    """
+    found, snippet = set(), None
+    overlap = max(len(term) for term in terms) - 1
+    tail = ""
+    try:
+        for chunk in iter_file_text(path, chunk_size):
+            text = tail + chunk
+            lowered = text.lower()
+            hits = {term for term in terms - found if term in lowered}
+            if hits:
+                found |= hits
+                if snippet is None:
+                    snippet = _snippet(text, [re.compile(re.escape(term), re.IGNORECASE) for term in hits])
+                if found == terms or (done and done(found)):
+                    break
+            tail = text[-overlap:] if overlap else ""
+    except OSError:
+        pass
+    return found, snippet
+
+
+def iter_search(query: str, limit: Optional[int] = None):
+    """
+    Yield matches as they are found, in registry order, without the index.
+    
+    Takes the same query syntax as search_ranked. Each resource is checked
+    field by field, then file by file in chunks; reading stops as soon as
+    the resource matches, and the whole search stops after limit results.
+    Useful for a first answer on a large corpus the index has not caught
+    up with yet.
+    
+    Yields:
+        Dicts like search_ranked's, with score 0.0
+    """
+    parsed = parse_search_query(query)
+    store = get_store()
+    keys = [key for key in REGISTRY_KEYS if not parsed["types"] or key in parsed["types"]]
+    types = {key: record_type for record_type, key in RECORD_TYPES.items()}
+    groups = [set(group) for group in parsed["groups"]]
+    if not groups:
+        # No words: same listing as search_ranked
+        yield from search_ranked(query, limit, refresh=False)
+        return
+    
+    def satisfied(found):
+        return any(group <= found for group in groups)
+    
+    terms = set().union(*groups)
+    count = 0
+    for key in keys:
+        for item in store.items(key):
+            found, match, snippet = set(), None, None
+            fields = [("name", item.get("name", "")), ("description", item.get("description", ""))]
+            if key == "prompts":
+                fields.append(("prompt", item.get("prompt", "")))
+            else:
+                fields.append(("paths", " ".join(item.get("files", []))))
+            for field, text in fields:
+                hits = {term for term in terms - found if term in (text or "").lower()}
+                if hits:
+                    found |= hits
+                    if match is None:
+                        match = field
+                        snippet = _snippet(text, [re.compile(re.escape(term), re.IGNORECASE) for term in hits])
+            
+            paths = [] if key == "prompts" else item.get("files", [])
+            for path in map(expand_path, paths):
+                if satisfied(found):
+                    break
+                hits, file_snippet = _scan_file(str(path), terms - found, lambda hits: satisfied(found | hits))
+                if hits:
+                    found |= hits
+                    if match is None:
+                        match, snippet = str(path), file_snippet
+            
+            if not satisfied(found):
+                continue
+            yield {"type": types[key], "name": item.get("name", ""), "score": 0.0,
+                   "match": match, "snippet": snippet or "", "item": item}
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+# ============================================
+# STATS
+# ============================================
+
+def get_stats() -> dict:
     """Get statistics about the registry."""
     return {
         "agents": len(get_agents()),
@@ -356,31 +2132,453 @@ def get_stats() -> dict:
     }
 
 
+# ============================================
+# IMPORT / EXPORT
+# ============================================
+
+# JSONL records carry their registry in a "type" field ("agent", "context"
+# or "prompt"); the remaining fields are stored as the registry record.
+RECORD_TYPES = {"agent": "agents", "context": "contexts", "prompt": "prompts"}
+
+# Fields a record needs before it can be imported, per registry
+_REQUIRED_FIELDS = {"agents": ("name", "files"), "contexts": ("name", "files"), "prompts": ("name", "prompt")}
+
+
+def _record_problem(key: str, record: dict) -> Optional[str]:
+    """Why a record can't be imported into registry key, or None if it can."""
+    missing = [field for field in _REQUIRED_FIELDS[key] if field not in record]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if not isinstance(record["name"], str) or not record["name"].strip():
+        return "name must be a non-empty string"
+    if key == "prompts":
+        if not isinstance(record["prompt"], str):
+            return "prompt must be a string"
+    elif not isinstance(record["files"], list) or not all(isinstance(f, str) for f in record["files"]):
+        return "files must be a list of paths"
+    if not isinstance(record.get("description", ""), str):
+        return "description must be a string"
+    return None
+
+
+def export_records(kinds: tuple = ("agents", "contexts", "prompts")):
+    """Yield every record of the given registries, tagged with its type."""
+    types = {key: record_type for record_type, key in RECORD_TYPES.items()}
+    store = get_store()
+    for key in REGISTRY_KEYS:
+        if key in kinds:
+            for item in store.items(key):
+                yield {"type": types[key], **item}
+
+
+def write_jsonl(records, f) -> int:
+    """Write records to a text file, one JSON object per line. Returns the count."""
+    count = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def iter_jsonl(f):
+    """Yield (line number, record or ValueError) for each non-blank line of a JSONL file."""
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield line_no, ValueError(f"invalid JSON: {e}")
+        else:
+            yield line_no, record
+
+
+def import_records(records, default_type: Optional[str] = None, on_duplicate: str = "skip") -> dict:
+    """
+    Add records to the registries with one locked read and write per registry.
+    
+    Args:
+        records: Iterable of (line number, record) pairs, as from iter_jsonl
+        default_type: Type for records without a "type" field
+        on_duplicate: 'skip' keeps the existing record, 'replace' overwrites it,
+            'error' reports the record as an error
+    
+    Returns:
+        Summary with added, replaced and skipped counts and a list of
+        (line number, message) errors. Each registry is written once, and
+        duplicates are found through the store's name index, so importing
+        n records costs O(n).
+    """
+    from contextlib import ExitStack
+    
+    if on_duplicate not in ("skip", "replace", "error"):
+        raise ValueError(f"Unknown duplicate policy: {on_duplicate}")
+    
+    summary = {"added": 0, "replaced": 0, "skipped": 0, "errors": []}
+    store = get_store()
+    batched = set()
+    
+    with ExitStack() as stack:
+        for line_no, record in records:
+            if isinstance(record, Exception):
+                summary["errors"].append((line_no, str(record)))
+                continue
+            record = dict(record)
+            record_type = record.pop("type", default_type)
+            key = RECORD_TYPES.get(record_type, record_type) if isinstance(record_type, str) else None
+            if key not in REGISTRY_KEYS:
+                summary["errors"].append((line_no, f"unknown type: {record_type!r}"))
+                continue
+            problem = _record_problem(key, record)
+            if problem:
+                summary["errors"].append((line_no, problem))
+                continue
+            
+            if key not in batched:
+                stack.enter_context(store.batch(key))
+                batched.add(key)
+            try:
+                action = store.put(key, record, on_duplicate)
+            except ValueError as e:
+                summary["errors"].append((line_no, str(e)))
+            else:
+                summary[action] += 1
+    
+    return summary
+
+
+# ============================================
+# MARKETPLACE CLIENT
+# ============================================
+
+# Timeouts (seconds) and retry policy for marketplace calls
+HTTP_CONNECT_TIMEOUT = float(os.getenv("AGENCO_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("AGENCO_READ_TIMEOUT", "300"))
+HTTP_MAX_RETRIES = int(os.getenv("AGENCO_MAX_RETRIES", "4"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Responses that mean a POST was not applied, so it is safe to send again
+POST_RETRY_STATUS_CODES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def _request_not_sent(error) -> bool:
+    """Whether a requests exception means the request never reached the server."""
+    import requests
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+    
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def create_http_session(pool_size: int = 10):
+    """Create a requests.Session whose connection pool fits pool_size workers."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class MarketplaceClient:
+    """
+    HTTP client for the Agenco marketplace API.
+    
+    Keeps connections alive in a pooled session, applies connect/read
+    timeouts to every call, and retries transient failures with
+    exponential backoff and jitter, honouring Retry-After. Safe to share
+    between threads.
+    
+    GET, PUT and other idempotent methods are retried on connection errors,
+    timeouts and 429/5xx responses. POST is not idempotent (a publish or
+    upload could be applied twice), so it is only retried when the request
+    never reached the server (connection refused, connect timeout) or the
+    server declined it (429, 503). Pass retry=False for calls that must
+    never be repeated, such as login and 2FA verification.
+    """
+    
+    def __init__(
+        self,
+        api_url: str = "https://agt.fly.dev",
+        token: str = None,
+        timeout: tuple = None,
+        max_retries: int = None,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        pool_size: int = 10
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        self.max_retries = HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = create_http_session(pool_size)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+    
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Seconds to wait before retry number attempt + 1."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    from email.utils import parsedate_to_datetime
+                    from datetime import datetime, timezone
+                    try:
+                        when = parsedate_to_datetime(retry_after)
+                        delay = (when - datetime.now(timezone.utc)).total_seconds()
+                        return min(max(delay, 0.0), self.max_backoff * 4)
+                    except (TypeError, ValueError):
+                        pass
+                else:
+                    # Negative values are clamped; nan and inf use the backoff below
+                    if math.isfinite(delay):
+                        return min(max(delay, 0.0), self.max_backoff * 4)
+        # Full jitter: uniform in [0, backoff * 2^attempt]
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+    
+    def request(self, method: str, path: str, auth: bool = True, headers: dict = None, data=None, files: dict = None,
+                retry: bool = True, **kwargs):
+        """
+        Send a request, retrying transient failures (see the class docstring).
+        
+        Args:
+            method: HTTP method
+            path: API path (e.g. '/api/v1/contexts') or absolute URL
+            auth: Send the bearer token if the client has one
+            headers: Extra headers
+            data: Request body; a callable is called on every attempt to
+                produce a fresh body (for generators), and seekable
+                streams are rewound between attempts
+            files: Multipart files; file objects are rewound between attempts
+            retry: False to send the request once, whatever happens
+            **kwargs: Passed through to requests (json, params, ...)
+        
+        Returns:
+            The final requests.Response (which may still be an error)
+        """
+        import requests
+        
+        url = path if path.startswith(("http://", "https://")) else f"{self.api_url}{path}"
+        headers = dict(headers or {})
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        kwargs.setdefault("timeout", self.timeout)
+        max_retries = self.max_retries if retry else 0
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = RETRY_STATUS_CODES if idempotent else POST_RETRY_STATUS_CODES
+        
+        attempt = 0
+        while True:
+            if files:
+                for value in files.values():
+                    if isinstance(value, tuple) and hasattr(value[1], "seek"):
+                        value[1].seek(0)
+            body = data() if callable(data) else data
+            if hasattr(body, "seek"):
+                body.seek(0)
+            
+            try:
+                with span(f"{method} {path.split('?')[0]}", "http", attempt=attempt) as info:
+                    response = self.session.request(method, url, headers=headers, data=body, files=files, **kwargs)
+                    if info is not None:
+                        info["status"] = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries or not (idempotent or _request_not_sent(e)):
+                    raise
+                delay = self._retry_delay(attempt)
+            else:
+                if response.status_code not in retry_statuses or attempt >= max_retries:
+                    return response
+                delay = self._retry_delay(attempt, response)
+                response.close()
+            
+            time.sleep(delay)
+            attempt += 1
+    
+    def get(self, path: str, **kwargs):
+        """Send a GET request."""
+        return self.request("GET", path, **kwargs)
+    
+    def post(self, path: str, **kwargs):
+        """Send a POST request."""
+        return self.request("POST", path, **kwargs)
+
+
+# Clients shared within a process, keyed by (api_url, token)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_url: str = "https://agt.fly.dev", token: str = None) -> MarketplaceClient:
+    """Get the shared marketplace client for an API URL and token."""
+    key = (api_url.rstrip("/"), token)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = MarketplaceClient(api_url, token)
+            _clients[key] = client
+        return client
+
+
+# ============================================
+# STREAMING PAYLOADS
+# ============================================
+
+# Request bodies are yielded in blocks of about this many bytes
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def iter_json_payload(payload: dict, stream_field: str, chunks, on_bytes=None):
+    """
+    Yield a payload as compact UTF-8 JSON, streaming one string field.
+    
+    The output is byte-for-byte what payload_hash encodes for the payload
+    with stream_field set to the concatenated chunks, but that string is
+    never built. on_bytes(total) is called with the bytes produced so far.
+    """
+    def encode(value):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    
+    def pieces():
+        yield "{"
+        for i, key in enumerate(sorted(payload)):
+            yield ("," if i else "") + encode(key) + ":"
+            if key != stream_field:
+                yield encode(payload[key])
+                continue
+            yield '"'
+            for chunk in chunks:
+                yield encode(chunk)[1:-1]
+            yield '"'
+        yield "}"
+    
+    buffer = bytearray()
+    total = 0
+    for piece in pieces():
+        buffer += piece.encode('utf-8')
+        if len(buffer) >= STREAM_BLOCK_SIZE:
+            total += len(buffer)
+            yield bytes(buffer)
+            buffer.clear()
+            if on_bytes:
+                on_bytes(total)
+    if buffer:
+        total += len(buffer)
+        yield bytes(buffer)
+        if on_bytes:
+            on_bytes(total)
+
+
+# Bytes JSON escapes in two characters (\" \\ \n ...) and as \u00XX (six).
+# Control bytes never occur inside multi-byte UTF-8 sequences.
+_JSON_SHORT_ESCAPED = b'"\\\n\r\t\b\f'
+_JSON_UNICODE_ESCAPED = bytes(c for c in range(0x20) if c not in _JSON_SHORT_ESCAPED)
+
+
+def json_payload_size(payload: dict, stream_field: str, chunks) -> int:
+    """
+    Bytes iter_json_payload produces for the same arguments, without
+    JSON-encoding the streamed text (counting escapes is several times
+    faster).
+    """
+    size = len(json.dumps({**payload, stream_field: ""}, sort_keys=True, ensure_ascii=False,
+                          separators=(",", ":")).encode('utf-8'))
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        size += len(data)
+        size += len(data) - len(data.translate(None, _JSON_SHORT_ESCAPED))
+        size += 5 * (len(data) - len(data.translate(None, _JSON_UNICODE_ESCAPED)))
+    return size
+
+
+class StreamedBody:
+    """
+    A request body streamed from a generator factory, with a Content-Length.
+    
+    Unless the length is given (see json_payload_size), one pass over the
+    body measures it and its digest up front, so it is sent with a
+    Content-Length rather than chunked. Each iteration streams a fresh
+    pass and hashes the bytes as they go out; sent_digest is the SHA-256
+    of the last complete pass. If a pass comes out a different length (a
+    file changed in between), OSError is raised and the request fails
+    instead of sending a body that doesn't match.
+    """
+    
+    def __init__(self, body, length: Optional[int] = None):
+        import hashlib
+        
+        self._body = body
+        self.length = length
+        self.digest = None
+        self.sent_digest = None
+        if length is None:
+            digest = hashlib.sha256()
+            self.length = 0
+            for block in body():
+                digest.update(block)
+                self.length += len(block)
+            self.digest = digest.hexdigest()
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __iter__(self):
+        import hashlib
+        
+        self.sent_digest = None
+        digest = hashlib.sha256()
+        sent = 0
+        for block in self._body():
+            sent += len(block)
+            if sent > self.length:
+                raise OSError("Request body grew while it was being sent")
+            digest.update(block)
+            yield block
+        if sent != self.length:
+            raise OSError("Request body shrank while it was being sent")
+        self.sent_digest = digest.hexdigest()
+
+
 # ============================================
 # PUBLISH TO AGENCO MARKETPLACE
 # ============================================
 
-def publish_agent(name: str, api_url: str = "https://agt.fly.dev", token: str = None) -> dict:
-    """Publish an agent to Agenco marketplace."""
-    import requests
-    
-    # Use saved token if not provided
-    if not token:
-        token = get_saved_token()
-        if not token:
-            raise ValueError("Not logged in. Run 'agenco login' first or provide --token")
+@traced("publish")
+def build_agent_payload(name: str, content: Optional[str] = None) -> dict:
+    """Build the marketplace payload for a registry agent.
     
+    The content is read from the agent's files unless given.
+    """
     agent = get_agent(name)
     if not agent:
         raise ValueError(f"Agent '{name}' not found")
     
     # Get agent content from files
-    content = get_agent_content(name)
+    if content is None:
+        content = get_agent_content(name)
     if not content:
         raise ValueError(f"Agent '{name}' has no content to publish")
     
-    # Prepare payload
-    payload = {
+    return {
         "name": agent.get("name"),
         "description": agent.get("description", ""),
         "content": content,
@@ -390,46 +2588,27 @@ def publish_agent(name: str, api_url: str = "https://agt.fly.dev", token: str =
         "is_public": True,
         "is_free": True,
     }
-    
-    # Make API request
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    
-    response = requests.post(
-        f"{api_url}/api/v1/publish/agent",
-        json=payload,
-        headers=headers
-    )
-    
-    if response.status_code in [200, 201]:
-        return response.json()
-    else:
-        raise Exception(f"Failed to publish agent: {response.status_code} - {response.text}")
 
 
-def publish_context(name: str, api_url: str = "https://agt.fly.dev", token: str = None) -> dict:
-    """Publish a context to Agenco marketplace."""
-    import requests
-    
-    # Use saved token if not provided
-    if not token:
-        token = get_saved_token()
-        if not token:
-            raise ValueError("Not logged in. Run 'agenco login' first or provide --token")
+@traced("publish")
+def build_context_payload(name: str, content: Optional[str] = None) -> dict:
+    """Build the marketplace payload for a registry context.
     
+    The content is read from the context's files unless given; publish
+    passes a placeholder and streams the real content instead.
+    """
     context = get_context(name)
     if not context:
         raise ValueError(f"Context '{name}' not found")
     
     # Get context content from files
-    content = get_context_content(name)
-    if not content:
+    if content is None:
+        content = get_context_content(name)
+    if not content or not context.get("files"):
         raise ValueError(f"Context '{name}' has no content to publish")
     
-    # Prepare payload
     ctx_name = context.get("name", "")
-    payload = {
+    return {
         "name": ctx_name,
         "display_name": ctx_name,
         "description": context.get("description", ""),
@@ -441,34 +2620,11 @@ def publish_context(name: str, api_url: str = "https://agt.fly.dev", token: str
         "is_public": True,
         "is_free": True,
     }
-    
-    # Make API request
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    
-    response = requests.post(
-        f"{api_url}/api/v1/contexts",
-        json=payload,
-        headers=headers
-    )
-    
-    if response.status_code in [200, 201]:
-        return response.json()
-    else:
-        raise Exception(f"Failed to publish context: {response.status_code} - {response.text}")
 
 
-def publish_prompt(name: str, api_url: str = "https://agt.fly.dev", token: str = None) -> dict:
-    """Publish a prompt to Agenco marketplace."""
-    import requests
-    
-    # Use saved token if not provided
-    if not token:
-        token = get_saved_token()
-        if not token:
-            raise ValueError("Not logged in. Run 'agenco login' first or provide --token")
-    
+@traced("publish")
+def build_prompt_payload(name: str) -> dict:
+    """Build the marketplace payload for a registry prompt."""
     prompt = get_prompt(name)
     if not prompt:
         raise ValueError(f"Prompt '{name}' not found")
@@ -477,8 +2633,7 @@ def publish_prompt(name: str, api_url: str = "https://agt.fly.dev", token: str =
     if not prompt_text:
         raise ValueError(f"Prompt '{name}' has no content to publish")
     
-    # Prepare payload
-    payload = {
+    return {
         "name": prompt.get("name"),
         "description": prompt.get("description", ""),
         "content": prompt_text,
@@ -489,41 +2644,368 @@ def publish_prompt(name: str, api_url: str = "https://agt.fly.dev", token: str =
         "is_public": True,
         "is_free": True,
     }
+
+
+def _publish_payload(kind: str, endpoint: str, payload: dict, api_url: str, token: str, client, force: bool) -> dict:
+    """Send a publish payload unless the manifest shows it is unchanged."""
+    name = payload.get("name")
+    digest = payload_hash(payload)
+    if not force and get_published_hash(api_url, kind, name) == digest:
+        return {"name": name, "action": "unchanged", "skipped": True}
     
     # Make API request
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    
-    response = requests.post(
-        f"{api_url}/api/v1/prompts/publish",
-        json=payload,
-        headers=headers
-    )
+    client = client or get_client(api_url, token)
+    response = client.post(endpoint, json=payload)
+    
+    if response.status_code in [200, 201]:
+        record_published(api_url, kind, name, digest)
+        return response.json()
+    elif response.status_code == 401:
+        _verified_tokens.discard((api_url.rstrip("/"), token))
+        raise AuthError(f"Session rejected by {api_url} (HTTP 401). Run 'agenco login' again")
+    else:
+        raise Exception(f"Failed to publish {kind}: {response.status_code} - {response.text}")
+
+
+def _publish_stream(kind: str, endpoint: str, name: str, body, api_url: str, token: str, client, force: bool) -> dict:
+    """Like _publish_payload, for a body produced by a generator factory.
+    
+    The body is streamed once to measure and hash it and again to send
+    it, so it is never held in memory. The manifest records the digest of
+    the bytes that were sent.
+    """
+    stream = StreamedBody(body)
+    if not force and get_published_hash(api_url, kind, name) == stream.digest:
+        return {"name": name, "action": "unchanged", "skipped": True}
+    
+    client = client or get_client(api_url, token)
+    response = client.post(endpoint, data=stream, headers={"Content-Type": "application/json"})
     
     if response.status_code in [200, 201]:
+        record_published(api_url, kind, name, stream.sent_digest or stream.digest)
         return response.json()
+    elif response.status_code == 401:
+        _verified_tokens.discard((api_url.rstrip("/"), token))
+        raise AuthError(f"Session rejected by {api_url} (HTTP 401). Run 'agenco login' again")
     else:
-        raise Exception(f"Failed to publish prompt: {response.status_code} - {response.text}")
+        raise Exception(f"Failed to publish {kind}: {response.status_code} - {response.text}")
+
+
+def publish_agent(name: str, api_url: str = "https://agt.fly.dev", token: str = None, client: MarketplaceClient = None, force: bool = False) -> dict:
+    """Publish an agent to Agenco marketplace.
+    
+    Pass a MarketplaceClient to publish through it instead of the shared
+    client for api_url and token. Unless force is set, an agent whose
+    payload is unchanged since its last publish to api_url is skipped.
+    """
+    token = require_token(api_url, token)
+    
+    payload = build_agent_payload(name)
+    return _publish_payload("agent", "/api/v1/publish/agent", payload, api_url, token, client, force)
+
+
+def publish_context(
+    name: str,
+    api_url: str = "https://agt.fly.dev",
+    token: str = None,
+    client: MarketplaceClient = None,
+    force: bool = False,
+    on_bytes=None
+) -> dict:
+    """Publish a context to Agenco marketplace.
+    
+    Pass a MarketplaceClient to publish through it instead of the shared
+    client for api_url and token. Unless force is set, a context whose
+    payload is unchanged since its last publish to api_url is skipped.
+    The content is streamed from its files, and on_bytes(total) is called
+    as the request body is sent.
+    """
+    # Large contexts check the token with the API before streaming
+    context = get_context(name) or {}
+    token = require_token(api_url, token, _total_size(context.get("files", [])), client)
+    
+    payload = build_context_payload(name, content="-")
+    body = lambda: iter_json_payload(payload, "long_description", iter_context_content(name), on_bytes)
+    return _publish_stream("context", "/api/v1/contexts", payload["name"], body, api_url, token, client, force)
+
+
+def publish_prompt(name: str, api_url: str = "https://agt.fly.dev", token: str = None, client: MarketplaceClient = None, force: bool = False) -> dict:
+    """Publish a prompt to Agenco marketplace.
+    
+    Pass a MarketplaceClient to publish through it instead of the shared
+    client for api_url and token. Unless force is set, a prompt whose
+    payload is unchanged since its last publish to api_url is skipped.
+    """
+    token = require_token(api_url, token)
+    
+    payload = build_prompt_payload(name)
+    return _publish_payload("prompt", "/api/v1/prompts/publish", payload, api_url, token, client, force)
+
+
+# ============================================
+# PUBLISH MANIFEST
+# ============================================
+
+# Content hashes of the last successful publish of each resource, per API
+# URL, so unchanged resources are not sent again. Entries are recorded in
+# memory and written when a publish finishes, or once at the end of a
+# manifest_batch (publish_all), merged under a lock with what other
+# processes wrote meanwhile.
+MANIFEST_FILE = CONFIG_DIR / "publish-manifest.json"
+
+_manifest = None
+_manifest_pending = {}  # (api_url, "kind:name") -> entry not yet written
+_manifest_batches = 0
+_manifest_lock = threading.Lock()
+
+
+@traced("publish")
+def payload_hash(payload: dict) -> str:
+    """Stable SHA-256 of a publish payload."""
+    import hashlib
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _load_manifest() -> dict:
+    """Load the publish manifest (once per process). Call with _manifest_lock held."""
+    global _manifest
+    if _manifest is None:
+        try:
+            _manifest = load_json(MANIFEST_FILE)
+        except (OSError, ValueError):
+            _manifest = {}
+        _manifest.setdefault("apis", {})
+    return _manifest
+
+
+def get_published_hash(api_url: str, kind: str, name: str) -> Optional[str]:
+    """Hash of the payload last published for a resource, if any."""
+    with _manifest_lock:
+        entry = _load_manifest()["apis"].get(api_url.rstrip("/"), {}).get(f"{kind}:{name}")
+    return entry.get("hash") if entry else None
+
+
+def record_published(api_url: str, kind: str, name: str, digest: str) -> None:
+    """Record a successful publish in the manifest.
+    
+    The manifest file is written right away, or at the end of the
+    enclosing manifest_batch.
+    """
+    from datetime import datetime, timezone
+    
+    entry = {
+        "hash": digest,
+        "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    key = (api_url.rstrip("/"), f"{kind}:{name}")
+    with _manifest_lock:
+        _load_manifest()["apis"].setdefault(key[0], {})[key[1]] = entry
+        _manifest_pending[key] = entry
+        batched = _manifest_batches > 0
+    if not batched:
+        flush_manifest()
+
+
+def flush_manifest() -> bool:
+    """
+    Write recorded entries to the manifest file.
+    
+    The file is re-read under a lock and the entries merged in, so
+    concurrent agenco processes don't drop each other's entries. A
+    failure is reported as a warning rather than raised: the resources
+    were published, they just may be sent again next time. Returns False
+    if the write failed (the entries are kept for the next flush).
+    """
+    global _manifest
+    with _manifest_lock:
+        pending = dict(_manifest_pending)
+    if not pending:
+        return True
+    
+    try:
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        with registry_transaction(MANIFEST_FILE) as data:
+            apis = data.setdefault("apis", {})
+            for (api, resource), entry in pending.items():
+                apis.setdefault(api, {})[resource] = entry
+            merged = json.loads(json.dumps(data))
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not update {MANIFEST_FILE}: {e}")
+        return False
+    
+    with _manifest_lock:
+        for key, entry in pending.items():
+            if _manifest_pending.get(key) is entry:
+                del _manifest_pending[key]
+        # Take in other processes' entries; keep ours recorded since the copy
+        for (api, resource), entry in _manifest_pending.items():
+            merged["apis"].setdefault(api, {})[resource] = entry
+        _manifest = merged
+    return True
+
+
+@contextmanager
+def manifest_batch():
+    """Defer manifest writes until the outermost batch ends, then write once."""
+    global _manifest_batches
+    with _manifest_lock:
+        _manifest_batches += 1
+    try:
+        yield
+    finally:
+        with _manifest_lock:
+            _manifest_batches -= 1
+            outermost = _manifest_batches == 0
+        if outermost:
+            flush_manifest()
+
+
+# ============================================
+# BULK PUBLISH
+# ============================================
+
+PUBLISH_KINDS = ("agents", "contexts", "prompts")
+
+
+def select_resources(kind: str, patterns: list = None, tags: list = None) -> list:
+    """
+    Select registry resource names of one kind.
+    
+    Args:
+        kind: 'agents', 'contexts' or 'prompts'
+        patterns: Glob patterns matched against names (any must match)
+        tags: Tags of which a resource must have at least one
+    """
+    from fnmatch import fnmatchcase
+    
+    getters = {"agents": get_agents, "contexts": get_contexts, "prompts": get_prompts}
+    if kind not in getters:
+        raise ValueError(f"Unknown resource type: {kind}")
+    
+    names = []
+    for item in getters[kind]():
+        name = item.get("name", "")
+        if patterns and not any(fnmatchcase(name, p) for p in patterns):
+            continue
+        if tags and not set(tags) & set(item.get("tags", [])):
+            continue
+        names.append(name)
+    return names
+
+
+def publish_all(
+    kinds: tuple = PUBLISH_KINDS,
+    patterns: list = None,
+    tags: list = None,
+    api_url: str = "https://agt.fly.dev",
+    token: str = None,
+    concurrency: int = 8,
+    force: bool = False,
+    on_result=None
+) -> dict:
+    """
+    Publish many registry resources in-process over one pooled client.
+    
+    Resources unchanged since their last publish to api_url are skipped
+    unless force is set. The token is checked before anything is sent, and
+    after a 401 the remaining resources fail without being uploaded.
+    
+    Args:
+        kinds: Resource kinds to publish
+        patterns: Glob patterns to select resources by name
+        tags: Tags to select resources by
+        api_url: API URL
+        token: Auth token (defaults to the saved token)
+        concurrency: Number of publishes in flight at once
+        force: Publish even if unchanged since the last publish
+        on_result: Optional callback(kind, name, result, error) per resource
+    
+    Returns:
+        dict with 'published' and 'skipped' [(kind, name, result)] and
+        'failed' [(kind, name, error)]
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    token = require_token(api_url, token)
+    
+    publishers = {"agents": publish_agent, "contexts": publish_context, "prompts": publish_prompt}
+    jobs = [(kind, name) for kind in kinds for name in select_resources(kind, patterns, tags)]
+    summary = {"published": [], "skipped": [], "failed": []}
+    if not jobs:
+        return summary
+    
+    concurrency = max(1, min(concurrency, len(jobs)))
+    client = MarketplaceClient(api_url, token, pool_size=concurrency)
+    lock = threading.Lock()
+    # Check the session once up front rather than failing mid-batch; if it
+    # is rejected anyway, the remaining resources aren't sent
+    try:
+        preflight_token(api_url, token, client)
+    except AuthError:
+        client.close()
+        raise
+    rejected = threading.Event()
+    
+    def run(job):
+        kind, name = job
+        result, error = None, None
+        try:
+            if rejected.is_set():
+                raise AuthError("Not sent: the session was rejected")
+            result = publishers[kind](name, api_url=api_url, token=token, client=client, force=force)
+            if not isinstance(result, dict):
+                # The API answered with JSON that isn't an object
+                result = {"response": result}
+        except AuthError as e:
+            rejected.set()
+            error = e
+        except Exception as e:
+            error = e
+        with lock:
+            if error is None:
+                summary["skipped" if result.get("skipped") else "published"].append((kind, name, result))
+            else:
+                summary["failed"].append((kind, name, error))
+            if on_result:
+                on_result(kind, name, result, error)
+    
+    try:
+        with manifest_batch(), ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="agenco-publish") as pool:
+            list(pool.map(run, jobs))
+    finally:
+        client.close()
+    return summary
 
 
 # ============================================
 # AUTHENTICATION
 # ============================================
 
+# The config is parsed once per process and re-read only when the file
+# changes, so publish calls and whoami don't each parse it again.
+_config_cache = None  # (mtime_ns, size, config)
+
+
 def get_config() -> dict:
     """Load user config from ~/.agenco/config.json"""
-    if not CONFIG_FILE.exists():
+    global _config_cache
+    try:
+        st = CONFIG_FILE.stat()
+    except FileNotFoundError:
         return {}
-    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    if _config_cache is None or _config_cache[:2] != (st.st_mtime_ns, st.st_size):
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            _config_cache = (st.st_mtime_ns, st.st_size, json.load(f))
+    return dict(_config_cache[2])
 
 
 def save_config(config: dict) -> None:
     """Save user config to ~/.agenco/config.json"""
+    global _config_cache
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    save_json(CONFIG_FILE, config)
+    _config_cache = None
 
 
 def get_saved_token() -> Optional[str]:
@@ -532,14 +3014,145 @@ def get_saved_token() -> Optional[str]:
     return config.get("token")
 
 
+# Tokens count as expired this many seconds early, so a request started just
+# before expiry isn't rejected halfway through its upload
+TOKEN_EXPIRY_MARGIN = 60
+# Uploads at least this large check the token with the API before sending
+PREFLIGHT_BYTES = int(float(os.getenv("AGENCO_PREFLIGHT_MB", "8")) * 1024 * 1024)
+AUTH_CHECK_PATH = "/api/v1/auth/me"
+# The preflight is sent once with a short read timeout: if the API is slow
+# to answer, the upload goes ahead rather than waiting minutes to start
+PREFLIGHT_TIMEOUT = 10
+
+# (api_url, token) pairs the API has accepted in this process
+_verified_tokens = set()
+
+
+class AuthError(ValueError):
+    """The token is missing, expired or rejected by the API."""
+
+
+def _jwt_expiry(token: str) -> Optional[float]:
+    """The 'exp' claim of a JWT (epoch seconds), if the token is one."""
+    import base64
+    
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+        return float(claims["exp"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _login_expiry(data: dict, token: str) -> Optional[float]:
+    """When the token from a login response expires (epoch seconds), if known."""
+    from datetime import datetime
+    
+    if data.get("expires_in"):
+        return time.time() + float(data["expires_in"])
+    expires_at = data.get("expires_at")
+    if expires_at:
+        try:
+            return float(expires_at)
+        except (TypeError, ValueError):
+            try:
+                return datetime.fromisoformat(str(expires_at).replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                pass
+    return _jwt_expiry(token)
+
+
+def token_expiry(token: Optional[str] = None) -> Optional[float]:
+    """
+    When a token (default: the saved one) expires, in epoch seconds.
+    
+    Uses the expiry recorded at login for the saved token, otherwise the
+    token's own 'exp' claim; None if unknown.
+    """
+    config = get_config()
+    if token is None or token == config.get("token"):
+        if config.get("token_expires_at"):
+            return float(config["token_expires_at"])
+        token = token or config.get("token")
+    return _jwt_expiry(token) if token else None
+
+
+def preflight_token(api_url: str, token: str, client: MarketplaceClient = None) -> bool:
+    """
+    Check a token with a cheap authenticated request, before a large upload.
+    
+    Returns True if the API accepted it and False if it could not tell
+    (no such endpoint, server or network error), in which case the upload
+    goes ahead. Accepted tokens are remembered for the rest of the process.
+    
+    Raises:
+        AuthError: if the API rejects the token (401/403)
+    """
+    import requests
+    
+    key = (api_url.rstrip("/"), token)
+    if key in _verified_tokens:
+        return True
+    client = client or get_client(api_url, token)
+    try:
+        response = client.request("GET", AUTH_CHECK_PATH, auth=False, retry=False,
+                                  timeout=(HTTP_CONNECT_TIMEOUT, PREFLIGHT_TIMEOUT),
+                                  headers={"Authorization": f"Bearer {token}"})
+    except (requests.ConnectionError, requests.Timeout):
+        return False
+    if response.status_code in (401, 403):
+        raise AuthError(f"Session rejected by {api_url} (HTTP {response.status_code}). Run 'agenco login' again")
+    if response.ok:
+        _verified_tokens.add(key)
+        return True
+    return False
+
+
+def require_token(api_url: str, token: Optional[str] = None, upload_bytes: int = 0, client=None) -> str:
+    """
+    The token to publish with: the given one, or the saved login.
+    
+    Fails before anything is sent if there is none or it has expired.
+    For uploads of PREFLIGHT_BYTES or more the token is also checked with
+    the API first (see preflight_token).
+    
+    Raises:
+        AuthError: not logged in, expired, or rejected by the preflight
+    """
+    token = token or get_saved_token()
+    if not token:
+        raise AuthError("Not logged in. Run 'agenco login' first or provide --token")
+    expires = token_expiry(token)
+    if expires is not None and expires - TOKEN_EXPIRY_MARGIN <= time.time():
+        expired_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(expires))
+        raise AuthError(f"Session expired at {expired_at}. Run 'agenco login' again")
+    if upload_bytes >= PREFLIGHT_BYTES:
+        preflight_token(api_url, token, client)
+    return token
+
+
+def _total_size(paths: list) -> int:
+    """Combined size of the files that exist among paths."""
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(expand_path(path))
+        except OSError:
+            pass
+    return total
+
+
 def login(email: str, password: str, api_url: str = "https://agt.fly.dev") -> dict:
     """Login to Agenco and save token."""
-    import requests
+    client = get_client(api_url)
     
     # Step 1: Initial login
-    response = requests.post(
-        f"{api_url}/api/v1/auth/login",
-        json={"email": email, "password": password}
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+        retry=False  # Sends a 2FA email
     )
     
     if response.status_code != 200:
@@ -554,9 +3167,10 @@ def login(email: str, password: str, api_url: str = "https://agt.fly.dev") -> di
         code = input("Enter 2FA code: ").strip()
         
         # Step 2: Verify 2FA
-        response = requests.post(
-            f"{api_url}/api/v1/auth/verify-2fa",
-            json={"session_id": session_id, "code": code}
+        response = client.post(
+            "/api/v1/auth/verify-2fa",
+            json={"session_id": session_id, "code": code},
+            retry=False  # The code is single-use
         )
         
         if response.status_code != 200:
@@ -571,8 +3185,9 @@ def login(email: str, password: str, api_url: str = "https://agt.fly.dev") -> di
     if not token:
         raise Exception("No token received from server")
     
-    # Save token and user info
-    config = {
+    # Save token and user info, keeping other settings
+    config = get_config()
+    config.update({
         "token": token,
         "user": {
             "email": user.get("email"),
@@ -580,15 +3195,24 @@ def login(email: str, password: str, api_url: str = "https://agt.fly.dev") -> di
             "id": user.get("id")
         },
         "api_url": api_url
-    }
+    })
+    expires = _login_expiry(data, token)
+    if expires is not None:
+        config["token_expires_at"] = int(expires)
+    else:
+        config.pop("token_expires_at", None)
     save_config(config)
     return data
 
 
 def logout() -> None:
-    """Remove saved authentication."""
-    if CONFIG_FILE.exists():
-        CONFIG_FILE.unlink()
+    """Remove saved authentication (other settings are kept)."""
+    config = get_config()
+    if config:
+        for key in ("token", "user", "api_url", "token_expires_at"):
+            config.pop(key, None)
+        save_config(config)
+    _verified_tokens.clear()
 
 
 def get_current_user() -> Optional[dict]:
@@ -613,46 +3237,214 @@ TEXT_EXTENSIONS = {'.md', '.txt', '.json', '.yaml', '.yml', '.toml', '.ini', '.c
 ASSET_EXTENSIONS = {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.mp3', '.mp4', '.wav', '.zip', '.tar', '.gz'}
 
 
-def get_directory_files(directory: Path = None) -> dict:
+# Ignore files honoured in every scanned directory, with .gitignore syntax
+IGNORE_FILES = ('.gitignore', '.agencoignore')
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a .gitignore glob into a regex over '/'-separated paths."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif c == '*':
+            out.append('[^/]*')
+            i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[' and pattern.find(']', i + 2) != -1:
+            j = pattern.find(']', i + 2)
+            body = pattern[i + 1:j]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            out.append('[' + body.replace('\\', '\\\\') + ']')
+            i = j + 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+
+def _compile_ignore_line(line: str, base: str) -> Optional[tuple]:
+    """Compile one ignore-file line into (regex, negate, dir_only), or None."""
+    line = line.rstrip()
+    if not line or line.startswith('#'):
+        return None
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    if line.startswith('\\'):
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    
+    # Patterns with a slash are relative to the ignore file's directory,
+    # others match a name at any depth below it
+    anchored = '/' in line
+    regex = _glob_to_regex(line.lstrip('/'))
+    prefix = re.escape(base + '/') if base else ''
+    if not anchored:
+        prefix += '(?:.*/)?'
+    return (re.compile(prefix + regex + '(?:/.*)?$'), negate, dir_only)
+
+
+def _load_ignore_rules(path: str, rel: str) -> list:
+    """Read the ignore files of one directory."""
+    rules = []
+    for ignore_name in IGNORE_FILES:
+        try:
+            with open(os.path.join(path, ignore_name), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for line in lines:
+            rule = _compile_ignore_line(line, rel)
+            if rule:
+                rules.append(rule)
+    return rules
+
+
+def _is_ignored(rules: list, rel_path: str, is_dir: bool) -> bool:
+    """Apply ignore rules in order; the last matching rule wins."""
+    ignored = False
+    for regex, negate, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if regex.match(rel_path):
+            ignored = not negate
+    return ignored
+
+
+def _scan_directory(task: tuple) -> tuple:
+    """
+    List one directory with os.scandir.
+    
+    Returns:
+        (files, subdirectory tasks, number of ignored entries)
+    """
+    path, rel, depth, rules = task
+    rules = rules + _load_ignore_rules(path, rel)
+    files = []
+    subdirs = []
+    ignored = 0
+    
+    try:
+        entries = sorted(os.scandir(path), key=lambda e: e.name)
+    except OSError:
+        if not rel:
+            raise  # The requested directory itself must be readable
+        return files, subdirs, ignored
+    
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        rel_path = f"{rel}/{entry.name}" if rel else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if _is_ignored(rules, rel_path, True):
+                    ignored += 1
+                else:
+                    subdirs.append((entry.path, rel_path, depth + 1, rules))
+            elif entry.is_file():
+                if _is_ignored(rules, rel_path, False):
+                    ignored += 1
+                    continue
+                files.append({
+                    'name': rel_path,
+                    'path': os.path.abspath(entry.path),
+                    'extension': os.path.splitext(entry.name)[1].lower(),
+                    'size': entry.stat().st_size
+                })
+        except OSError:
+            continue  # Vanished or unreadable entry
+    return files, subdirs, ignored
+
+
+@traced("io")
+def get_directory_files(
+    directory: Path = None,
+    recursive: bool = False,
+    max_depth: int = None,
+    max_total_bytes: int = None
+) -> dict:
     """
     Scan a directory and categorize files.
     
+    Hidden files and directories are skipped, and .gitignore/.agencoignore
+    patterns are honoured. In recursive mode the tree is scanned level by
+    level, with the directories of each level listed concurrently.
+    
+    Args:
+        directory: Directory to scan (defaults to current directory)
+        recursive: Descend into subdirectories
+        max_depth: Deepest subdirectory level to scan (None: unlimited)
+        max_total_bytes: Stop the scan at the first text or asset file that
+            would take their total size past this, so the result is a
+            prefix of the scan order (level by level, by name within each
+            directory)
+    
     Returns:
-        dict with 'text_files' (for context) and 'asset_files' (for R2 upload)
+        dict with 'text_files' (for context) and 'asset_files' (for R2 upload);
+        in recursive mode file names are paths relative to the directory
     """
     if directory is None:
         directory = Path.cwd()
     
     directory = Path(directory)
+    if not recursive:
+        max_depth = 0
     
     text_files = []
     asset_files = []
     other_files = []
+    ignored = 0
+    total_size = 0
+    limit_reached = False
     
-    # Scan directory (non-recursive for now, can add option later)
-    for item in directory.iterdir():
-        if item.is_file() and not item.name.startswith('.'):
-            ext = item.suffix.lower()
-            file_info = {
-                'name': item.name,
-                'path': str(item.absolute()),
-                'extension': ext,
-                'size': item.stat().st_size
-            }
+    level = [(str(directory), '', 0, [])]
+    while level and not limit_reached:
+        next_level = []
+        for files, subdirs, skipped in map_concurrent(_scan_directory, level):
+            ignored += skipped
+            for file_info in files:
+                ext = file_info['extension']
+                if ext in TEXT_EXTENSIONS:
+                    bucket = text_files
+                elif ext in ASSET_EXTENSIONS:
+                    bucket = asset_files
+                else:
+                    other_files.append(file_info)
+                    continue
+                
+                if max_total_bytes is not None and total_size + file_info['size'] > max_total_bytes:
+                    limit_reached = True
+                    break
+                total_size += file_info['size']
+                bucket.append(file_info)
+            if limit_reached:
+                break
             
-            if ext in TEXT_EXTENSIONS:
-                text_files.append(file_info)
-            elif ext in ASSET_EXTENSIONS:
-                asset_files.append(file_info)
-            else:
-                other_files.append(file_info)
+            next_level.extend(t for t in subdirs if max_depth is None or t[2] <= max_depth)
+        level = next_level
     
     return {
         'text_files': text_files,
         'asset_files': asset_files,
         'other_files': other_files,
         'directory': str(directory),
-        'directory_name': directory.name
+        'directory_name': directory.name,
+        'ignored': ignored,
+        'total_size': total_size,
+        'limit_reached': limit_reached
     }
 
 
@@ -662,29 +3454,190 @@ def read_text_file(filepath: str) -> str:
         return f.read()
 
 
-def upload_asset_to_r2(filepath: str, api_url: str = "https://agt.fly.dev", token: str = None) -> dict:
-    """Upload an asset file to R2 storage via API."""
-    import requests
+# Asset uploads stream files from disk in chunks and run concurrently
+ASSET_UPLOAD_WORKERS = int(os.getenv("AGENCO_UPLOAD_WORKERS", "4"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def format_size(size: float) -> str:
+    """Format a byte count for humans (e.g. '1.5 MB')."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def parse_size(text: str) -> int:
+    """Parse a size like '500', '64K', '1.5M' or '2G' into bytes."""
+    text = text.strip().upper().rstrip('B')
+    multipliers = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+class UploadProgress:
+    """
+    Thread-safe progress of a batch of asset uploads.
+    
+    Renderers can poll it, or pass a listener that is called with the
+    progress object after every update (from upload worker threads).
+    """
+    
+    def __init__(self, files: list = None, listener=None):
+        files = files or []
+        self.total = sum(f.get('size', 0) for f in files)
+        self.files_total = len(files)
+        self.files_done = 0
+        self.failed = []
+        self.listener = listener
+        self.started = time.monotonic()
+        self._sent = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def sent(self) -> int:
+        """Bytes sent so far across all files."""
+        return sum(self._sent.values())
+    
+    @property
+    def rate(self) -> float:
+        """Average throughput in bytes per second."""
+        elapsed = time.monotonic() - self.started
+        return self.sent / elapsed if elapsed > 0 else 0.0
+    
+    def update(self, key: str, sent: int) -> None:
+        """Set how many bytes of one file have been sent (restarts on retry)."""
+        with self._lock:
+            self._sent[key] = sent
+        if self.listener:
+            self.listener(self)
+    
+    def finish(self, key: str, error: Exception = None) -> None:
+        """Mark one file as done, successfully or not."""
+        with self._lock:
+            self.files_done += 1
+            if error is not None:
+                self.failed.append((key, error))
+        if self.listener:
+            self.listener(self)
+
+
+class MultipartFileStream:
+    """
+    A multipart/form-data body for one file, read from disk in chunks.
+    
+    requests sends it with a Content-Length and pulls it block by block,
+    so the file is never held in memory. Reports bytes read to on_read.
+    """
+    
+    def __init__(self, filepath: str, field: str = "file", content_type: str = "application/octet-stream",
+                 on_read=None, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        import uuid
+        
+        self.path = Path(filepath)
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size
+        self.on_read = on_read
+        
+        filename = self.path.name.replace('"', '%22')
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode('utf-8')
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode('utf-8')
+        self._file_size = self.path.stat().st_size
+        self._file = None
+        self._pos = 0
+    
+    def __len__(self) -> int:
+        return len(self._head) + self._file_size + len(self._tail)
+    
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if (offset, whence) != (0, 0):
+            raise OSError("MultipartFileStream can only be rewound")
+        self._pos = 0
+        return 0
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self)
+        out = []
+        head_len = len(self._head)
+        body_end = head_len + self._file_size
+        
+        while size > 0 and self._pos < len(self):
+            if self._pos < head_len:
+                part = self._head[self._pos:self._pos + size]
+            elif self._pos < body_end:
+                if self._file is None:
+                    self._file = open(self.path, 'rb')
+                self._file.seek(self._pos - head_len)
+                part = self._file.read(min(size, body_end - self._pos))
+                if not part:
+                    raise OSError(f"{self.path} shrank while uploading")
+            else:
+                part = self._tail[self._pos - body_end:self._pos - body_end + size]
+            out.append(part)
+            self._pos += len(part)
+            size -= len(part)
+        
+        if self.on_read:
+            self.on_read(min(max(self._pos - head_len, 0), self._file_size))
+        return b"".join(out)
+    
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def upload_asset_to_r2(
+    filepath: str,
+    api_url: str = "https://agt.fly.dev",
+    token: str = None,
+    client: MarketplaceClient = None,
+    progress: UploadProgress = None,
+    resume: bool = False
+) -> dict:
+    """Upload an asset file to R2 storage via API.
     
-    if not token:
-        token = get_saved_token()
-        if not token:
-            raise ValueError("Not logged in. Run 'agenco login' first")
+    Files of RESUMABLE_UPLOAD_THRESHOLD bytes or more go through a
+    resumable chunked session (see upload_asset_resumable) when the server
+    supports it; others are streamed from disk as one multipart body. If
+    progress is given, bytes sent are reported to it under the file path.
+    """
+    token = require_token(api_url, token, os.path.getsize(filepath), client)
     
-    file_path = Path(filepath)
+    client = client or get_client(api_url, token)
+    if os.path.getsize(filepath) >= RESUMABLE_UPLOAD_THRESHOLD:
+        try:
+            return upload_asset_resumable(filepath, api_url, token, client=client, progress=progress, resume=resume)
+        except ResumableUploadUnsupported:
+            pass
     
-    # Prepare multipart upload
-    with open(file_path, 'rb') as f:
-        files = {
-            'file': (file_path.name, f, 'application/octet-stream')
-        }
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        response = requests.post(
-            f"{api_url}/api/v1/upload/asset",
-            files=files,
-            headers=headers
+    on_read = (lambda sent: progress.update(str(filepath), sent)) if progress else None
+    stream = MultipartFileStream(filepath, on_read=on_read)
+    try:
+        response = client.post(
+            "/api/v1/upload/asset",
+            data=stream,
+            headers={"Content-Type": stream.content_type}
         )
+    finally:
+        stream.close()
     
     if response.status_code in [200, 201]:
         return response.json()
@@ -692,12 +3645,54 @@ def upload_asset_to_r2(filepath: str, api_url: str = "https://agt.fly.dev", toke
         raise Exception(f"Failed to upload asset: {response.status_code} - {response.text}")
 
 
+def upload_assets(
+    asset_files: list,
+    api_url: str = "https://agt.fly.dev",
+    token: str = None,
+    client: MarketplaceClient = None,
+    workers: int = None,
+    progress: UploadProgress = None,
+    resume: bool = False
+) -> list:
+    """
+    Upload asset files concurrently.
+    
+    Args:
+        asset_files: File infos as returned by get_directory_files
+        workers: Uploads in flight at once (default: AGENCO_UPLOAD_WORKERS)
+        progress: Optional UploadProgress; failures are recorded on it
+        resume: Continue interrupted chunked uploads from their journals
+    
+    Returns:
+        List of (file_info, result, error) in the order of asset_files
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    workers = max(1, min(workers or ASSET_UPLOAD_WORKERS, len(asset_files) or 1))
+    client = client or get_client(api_url, token)
+    
+    def upload(asset_info):
+        try:
+            result = upload_asset_to_r2(asset_info['path'], api_url, token, client=client, progress=progress, resume=resume)
+        except Exception as e:
+            if progress:
+                progress.finish(asset_info['path'], e)
+            return asset_info, None, e
+        if progress:
+            progress.finish(asset_info['path'])
+        return asset_info, result, None
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agenco-upload") as pool:
+        return list(pool.map(upload, asset_files))
+
+
 def publish_agent_from_file(
     filepath: str, 
     name: str = None,
     description: str = None,
     api_url: str = "https://agt.fly.dev", 
-    token: str = None
+    token: str = None,
+    force: bool = False
 ) -> dict:
     """
     Publish an agent from a single .md or .json file.
@@ -708,13 +3703,9 @@ def publish_agent_from_file(
         description: Agent description
         api_url: API URL
         token: Auth token
+        force: Publish even if unchanged since the last publish
     """
-    import requests
-    
-    if not token:
-        token = get_saved_token()
-        if not token:
-            raise ValueError("Not logged in. Run 'agenco login' first or provide --token")
+    token = require_token(api_url, token)
     
     file_path = Path(filepath)
     if not file_path.exists():
@@ -757,18 +3748,30 @@ def publish_agent_from_file(
         "is_free": True,
     }
     
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    response = requests.post(
-        f"{api_url}/api/v1/publish/agent",
-        json=payload,
-        headers=headers
-    )
+    return _publish_payload("agent", "/api/v1/publish/agent", payload, api_url, token, None, force)
+
+
+def build_directory_payload(name: str, description: str, assets: list = None) -> dict:
+    """Build the marketplace payload for a directory context.
     
-    if response.status_code in [200, 201]:
-        return response.json()
-    else:
-        raise Exception(f"Failed to publish agent: {response.status_code} - {response.text}")
+    long_description is left empty; publishing streams the bundled text
+    into it. assets are the {'name', 'url', 'type'} of uploaded files.
+    """
+    payload = {
+        "name": name,
+        "display_name": name,
+        "description": description,
+        "long_description": "",
+        "tags": [],
+        "category": "other",
+        "content_type": "documents",
+        "status": "active",
+        "is_public": True,
+        "is_free": True,
+    }
+    if assets:
+        payload["assets"] = assets
+    return payload
 
 
 def publish_context_from_directory(
@@ -777,13 +3780,20 @@ def publish_context_from_directory(
     description: str = None,
     api_url: str = "https://agt.fly.dev",
     token: str = None,
-    include_assets: bool = True
+    include_assets: bool = True,
+    upload_workers: int = None,
+    progress_listener=None,
+    resume: bool = False,
+    recursive: bool = False,
+    max_depth: int = None,
+    max_total_bytes: int = None,
+    on_bytes=None
 ) -> dict:
     """
     Publish a context from all files in a directory.
     
     - .md and other text files are bundled as context content
-    - .pdf and other assets are uploaded to R2
+    - .pdf and other assets are uploaded to R2, several at a time
     
     Args:
         directory: Directory path (defaults to current directory)
@@ -792,17 +3802,21 @@ def publish_context_from_directory(
         api_url: API URL
         token: Auth token
         include_assets: Whether to upload asset files to R2
-    """
-    import requests
+        upload_workers: Concurrent asset uploads (default: AGENCO_UPLOAD_WORKERS)
+        progress_listener: Optional callback(UploadProgress) for rendering
+            upload progress; when given, per-file upload lines are not printed
+        resume: Continue interrupted chunked asset uploads
+        recursive, max_depth, max_total_bytes: Scan options, see get_directory_files
+        on_bytes: Optional callback(total) as the payload is streamed
     
-    if not token:
-        token = get_saved_token()
-        if not token:
-            raise ValueError("Not logged in. Run 'agenco login' first or provide --token")
+    Text files are streamed into the request body rather than joined in
+    memory, so memory use does not grow with the size of the directory.
+    """
+    token = require_token(api_url, token)
     
     # Get directory info
     dir_path = Path(directory) if directory else Path.cwd()
-    files_info = get_directory_files(dir_path)
+    files_info = get_directory_files(dir_path, recursive, max_depth, max_total_bytes)
     
     if not name:
         name = files_info['directory_name']
@@ -810,64 +3824,695 @@ def publish_context_from_directory(
     if not description:
         description = f"Context from {files_info['directory_name']} directory"
     
-    # Bundle text content
-    content_parts = []
+    # Text content is streamed into the request body file by file
+    entries = []
     for file_info in files_info['text_files']:
-        try:
-            file_content = read_text_file(file_info['path'])
-            content_parts.append(f"# File: {file_info['name']}\n\n{file_content}")
-        except Exception as e:
-            print(f"[WARN] Could not read {file_info['name']}: {e}")
+        if os.access(file_info['path'], os.R_OK):
+            entries.append((file_info['name'], file_info['path']))
+        else:
+            print(f"[WARN] Could not read {file_info['name']}: permission denied")
     
-    if not content_parts:
+    if not entries:
         raise ValueError("No text files found in directory to publish")
     
-    content = "\n\n---\n\n".join(content_parts)
+    client = get_client(api_url, token)
+    if files_info['total_size'] >= PREFLIGHT_BYTES:
+        preflight_token(api_url, token, client)
     
     # Upload assets if requested
     asset_urls = []
     if include_assets and files_info['asset_files']:
-        print(f"\n[Info] Uploading {len(files_info['asset_files'])} asset files to storage...")
-        for asset_info in files_info['asset_files']:
-            try:
-                result = upload_asset_to_r2(asset_info['path'], api_url, token)
+        progress = None
+        if progress_listener:
+            progress = UploadProgress(files_info['asset_files'], listener=progress_listener)
+        else:
+            print(f"\n[Info] Uploading {len(files_info['asset_files'])} asset files to storage...")
+        
+        uploads = upload_assets(
+            files_info['asset_files'], api_url, token,
+            client=client, workers=upload_workers, progress=progress, resume=resume
+        )
+        for asset_info, result, error in uploads:
+            if error is None:
                 asset_urls.append({
                     'name': asset_info['name'],
                     'url': result.get('url', ''),
                     'type': asset_info['extension']
                 })
+            if progress:
+                continue
+            if error is None:
                 print(f"  [OK] Uploaded {asset_info['name']}")
-            except Exception as e:
-                print(f"  [WARN] Failed to upload {asset_info['name']}: {e}")
+            else:
+                print(f"  [WARN] Failed to upload {asset_info['name']}: {error}")
     
-    # Prepare payload
-    payload = {
+    payload = build_directory_payload(name, description, asset_urls)
+    body = StreamedBody(
+        lambda: iter_json_payload(payload, "long_description", iter_bundle_text(entries), on_bytes),
+        json_payload_size(payload, "long_description", iter_bundle_text(entries))
+    )
+    response = client.post("/api/v1/contexts", data=body, headers={"Content-Type": "application/json"})
+    
+    if response.status_code in [200, 201]:
+        return response.json()
+    else:
+        raise Exception(f"Failed to publish context: {response.status_code} - {response.text}")
+
+
+# ============================================
+# PUBLISH PLAN
+# ============================================
+
+# What a publish would send, worked out from file metadata alone: nothing
+# is read beyond the registries and nothing goes over the network.
+# Text sizes are raw file sizes, so JSON escaping (mostly newlines) makes
+# the real payload slightly larger.
+
+# Assumed upload bandwidth for transfer time estimates, in Mbit/s
+PLAN_UPLOAD_MBPS = float(os.getenv("AGENCO_UPLOAD_MBPS", "20"))
+# Multipart boundary and headers around each uploaded asset, roughly
+MULTIPART_OVERHEAD = 256
+
+
+def _new_plan(kind: str, name: str) -> dict:
+    return {
+        "kind": kind,
         "name": name,
-        "display_name": name,
-        "description": description,
-        "long_description": content,
-        "tags": [],
-        "category": "other",
-        "content_type": "documents",
-        "status": "active",
-        "is_public": True,
-        "is_free": True,
+        "payload_bytes": 0,
+        "text_files": 0,
+        "assets": [],
+        "skipped": [],
+        "unreadable": [],
+        "ignored": 0,
+        "limit_reached": False,
+        "error": None,
+    }
+
+
+def _stat_readable(path) -> tuple:
+    """(size, None) for a readable file, else (None, reason); stat and access only."""
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        return None, "not found"
+    except OSError as e:
+        return None, e.strerror or str(e)
+    if not os.access(path, os.R_OK):
+        return None, "permission denied"
+    return size, None
+
+
+def _encoded_size(payload: dict, stream_field: str = None) -> int:
+    """Bytes of a payload as compact JSON (as sent), with stream_field empty."""
+    if stream_field:
+        payload = {**payload, stream_field: ""}
+    return len(json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+
+
+def _bundle_size(sections: list) -> int:
+    """
+    Bytes the '# File:' bundle of (label, size) sections adds to a JSON
+    string; size None stands for a [FILE NOT FOUND] section.
+    """
+    total = 0
+    for i, (label, size) in enumerate(sections):
+        text = (FILE_SEPARATOR if i else "") + f"# File: {label}\n\n"
+        if size is None:
+            text += "[FILE NOT FOUND]"
+        total += len(json.dumps(text, ensure_ascii=False)[1:-1].encode('utf-8')) + (size or 0)
+    return total
+
+
+def _plan_files(plan: dict, files: list) -> list:
+    """Stat a resource's registry files, recording unreadable ones; returns bundle sections."""
+    sections = []
+    stats = map_concurrent(lambda f: _stat_readable(expand_path(f)), files)
+    for file_path, (size, reason) in zip(files, stats):
+        if reason:
+            plan["unreadable"].append((file_path, reason))
+        else:
+            plan["text_files"] += 1
+        sections.append((file_path, size))
+    return sections
+
+
+@traced("publish")
+def plan_publish(kind: str, name: str) -> dict:
+    """
+    Plan publishing one registry resource without reading its files.
+    
+    Args:
+        kind: 'agent', 'context' or 'prompt'
+        name: Resource name
+    
+    Returns:
+        dict with 'kind', 'name', 'payload_bytes', 'text_files', 'assets',
+        'skipped' and 'unreadable' [(name, reason)], and 'error' (why it
+        could not be published, or None)
+    """
+    plan = _new_plan(kind, name)
+    try:
+        if kind == "prompt":
+            plan["payload_bytes"] = _encoded_size(build_prompt_payload(name))
+        elif kind in ("agent", "context"):
+            item = get_agent(name) if kind == "agent" else get_context(name)
+            files = (item or {}).get("files", [])
+            sections = _plan_files(plan, files)
+            # A placeholder stands in for the content, as publish_context does
+            content = "-" if files else ""
+            if kind == "agent":
+                payload, field = build_agent_payload(name, content=content), "content"
+            else:
+                payload, field = build_context_payload(name, content=content), "long_description"
+            plan["payload_bytes"] = _encoded_size(payload, field) + _bundle_size(sections)
+            # Missing files are sent as [FILE NOT FOUND]; other errors stop the publish
+            for file_path, reason in plan["unreadable"]:
+                if reason != "not found":
+                    plan["error"] = f"Cannot read {file_path}: {reason}"
+                    break
+        else:
+            raise ValueError(f"Unknown resource type: {kind}")
+    except ValueError as e:
+        plan["error"] = str(e)
+    return plan
+
+
+@traced("publish")
+def plan_publish_all(kinds: tuple = PUBLISH_KINDS, patterns: list = None, tags: list = None) -> list:
+    """Plan publish_all for the same selection: a plan_publish per resource."""
+    return [
+        plan_publish(kind[:-1], name)
+        for kind in kinds
+        for name in select_resources(kind, patterns, tags)
+    ]
+
+
+@traced("publish")
+def plan_publish_file(filepath: str, name: str = None, description: str = None) -> dict:
+    """Plan publish_agent_from_file from the file's size."""
+    file_path = Path(filepath)
+    plan = _new_plan("agent", name or file_path.stem)
+    ext = file_path.suffix.lower()
+    size, reason = _stat_readable(file_path)
+    if reason:
+        plan["unreadable"].append((str(file_path), reason))
+        plan["error"] = f"File {reason}: {filepath}"
+    elif ext not in {'.md', '.json'}:
+        plan["error"] = f"Invalid file type: {ext}. Only .md and .json are supported for agents."
+    else:
+        plan["text_files"] = 1
+        payload = {
+            "name": plan["name"],
+            "description": description or f"Agent from {file_path.name}",
+            "content": "",
+            "tags": [],
+            "category": "other",
+            "status": "active",
+            "is_public": True,
+            "is_free": True,
+        }
+        plan["payload_bytes"] = _encoded_size(payload) + size
+    return plan
+
+
+@traced("publish")
+def plan_publish_directory(
+    directory: str = None,
+    name: str = None,
+    description: str = None,
+    include_assets: bool = True,
+    recursive: bool = False,
+    max_depth: int = None,
+    max_total_bytes: int = None
+) -> dict:
+    """
+    Plan publish_context_from_directory from a metadata-only scan.
+    
+    Besides the plan_publish keys, 'ignored' counts entries excluded by
+    .gitignore/.agencoignore and 'limit_reached' tells whether
+    max_total_bytes cut the scan short. Assets of
+    RESUMABLE_UPLOAD_THRESHOLD bytes or more are marked 'resumable'.
+    """
+    dir_path = Path(directory) if directory else Path.cwd()
+    files_info = get_directory_files(dir_path, recursive, max_depth, max_total_bytes)
+    name = name or files_info['directory_name']
+    description = description or f"Context from {files_info['directory_name']} directory"
+    
+    plan = _new_plan("context", name)
+    plan["ignored"] = files_info['ignored']
+    plan["limit_reached"] = files_info['limit_reached']
+    plan["skipped"] = [(f['name'], "unsupported file type") for f in files_info['other_files']]
+    
+    sections = []
+    for file_info in files_info['text_files']:
+        if os.access(file_info['path'], os.R_OK):
+            sections.append((file_info['name'], file_info['size']))
+        else:
+            plan["unreadable"].append((file_info['name'], "permission denied"))
+    plan["text_files"] = len(sections)
+    
+    assets = []
+    for file_info in files_info['asset_files']:
+        if not include_assets:
+            plan["skipped"].append((file_info['name'], "--no-assets"))
+        elif not os.access(file_info['path'], os.R_OK):
+            plan["unreadable"].append((file_info['name'], "permission denied"))
+        else:
+            plan["assets"].append({
+                'name': file_info['name'],
+                'size': file_info['size'],
+                'resumable': file_info['size'] >= RESUMABLE_UPLOAD_THRESHOLD
+            })
+            assets.append({'name': file_info['name'], 'url': '', 'type': file_info['extension']})
+    
+    if not sections:
+        plan["error"] = "No text files found in directory to publish"
+    payload = build_directory_payload(name, description, assets)
+    plan["payload_bytes"] = _encoded_size(payload, "long_description") + _bundle_size(sections)
+    return plan
+
+
+def summarize_plans(plans: list, mbps: float = None) -> dict:
+    """
+    Totals over plans that would be published.
+    
+    Returns:
+        dict with 'resources', 'payload_bytes', 'assets', 'asset_bytes',
+        'total_bytes' and 'seconds', the estimated transfer time at mbps
+        (default: AGENCO_UPLOAD_MBPS)
+    """
+    mbps = mbps or PLAN_UPLOAD_MBPS
+    publishable = [plan for plan in plans if not plan["error"]]
+    payload_bytes = sum(plan["payload_bytes"] for plan in publishable)
+    assets = [asset for plan in publishable for asset in plan["assets"]]
+    asset_bytes = sum(asset['size'] for asset in assets)
+    total = payload_bytes + asset_bytes + MULTIPART_OVERHEAD * len(assets)
+    return {
+        "resources": len(publishable),
+        "payload_bytes": payload_bytes,
+        "assets": len(assets),
+        "asset_bytes": asset_bytes,
+        "total_bytes": total,
+        "seconds": total * 8 / (mbps * 1000 * 1000),
+        "mbps": mbps,
     }
+
+
+# ============================================
+# RESUMABLE UPLOADS
+# ============================================
+
+# Assets at least this large are sent in checksummed chunks through an
+# upload session, so a dropped connection only costs the current chunk.
+# Progress is journaled in ~/.agenco/uploads/ for 'publish --resume'.
+UPLOADS_DIR = CONFIG_DIR / "uploads"
+RESUMABLE_UPLOAD_THRESHOLD = int(os.getenv("AGENCO_RESUMABLE_THRESHOLD", str(64 * 1024 * 1024)))
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class ResumableUploadUnsupported(Exception):
+    """The server does not offer chunked upload sessions."""
+
+
+def _upload_journal_path(filepath: Path, api_url: str) -> Path:
+    """Journal file for one (file, API URL) pair."""
+    import hashlib
+    key = f"{api_url.rstrip('/')}|{filepath.resolve()}"
+    return UPLOADS_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+
+def _save_upload_journal(journal_file: Path, journal: dict) -> None:
+    """Write an upload journal atomically."""
+    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = journal_file.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, indent=2)
+    os.replace(tmp_file, journal_file)
+
+
+def get_pending_uploads() -> list:
+    """List journals of chunked uploads that did not complete."""
+    pending = []
+    if UPLOADS_DIR.exists():
+        for journal_file in sorted(UPLOADS_DIR.glob("*.json")):
+            try:
+                pending.append(load_json(journal_file))
+            except (OSError, ValueError):
+                continue
+    return pending
+
+
+def upload_asset_resumable(
+    filepath: str,
+    api_url: str = "https://agt.fly.dev",
+    token: str = None,
+    client: MarketplaceClient = None,
+    progress: UploadProgress = None,
+    resume: bool = False,
+    chunk_size: int = RESUMABLE_CHUNK_SIZE
+) -> dict:
+    """
+    Upload an asset in checksummed chunks through an upload session.
+    
+    Session protocol (extension of /api/v1/upload/asset):
+        POST /api/v1/upload/asset/sessions             -> {"upload_id"}
+        GET  /api/v1/upload/asset/sessions/<id>        -> {"received": [chunk indexes]}
+        PUT  /api/v1/upload/asset/sessions/<id>/chunks/<index>
+             (X-Chunk-SHA256 header; rejected if the body doesn't match)
+        POST /api/v1/upload/asset/sessions/<id>/complete -> same as /upload/asset
+    
+    Every acknowledged chunk is recorded in a journal under
+    ~/.agenco/uploads/. With resume=True an upload of the same unchanged
+    file to the same API continues from the chunks the server already has;
+    otherwise a new session is started. The journal is removed on success.
+    
+    Raises:
+        ResumableUploadUnsupported: if the server has no session endpoint
+    """
+    import hashlib
+    
+    token = require_token(api_url, token, os.path.getsize(filepath), client)
+    
+    file_path = Path(filepath)
+    st = file_path.stat()
+    client = client or get_client(api_url, token)
+    journal_file = _upload_journal_path(file_path, client.api_url)
+    
+    journal = None
+    if resume and journal_file.exists():
+        try:
+            journal = load_json(journal_file)
+        except ValueError:
+            journal = None
+        if journal and (journal.get("size"), journal.get("mtime_ns")) != (st.st_size, st.st_mtime_ns):
+            journal = None  # File changed since the interrupted upload
+    
+    received = set()
+    if journal:
+        response = client.get(f"/api/v1/upload/asset/sessions/{journal['upload_id']}")
+        if response.status_code == 200:
+            received = set(response.json().get("received", []))
+        else:
+            journal = None  # Session expired on the server
     
-    # Add asset URLs if any were uploaded
-    if asset_urls:
-        payload["assets"] = asset_urls
+    if not journal:
+        response = client.post("/api/v1/upload/asset/sessions", json={
+            "filename": file_path.name,
+            "size": st.st_size,
+            "chunk_size": chunk_size,
+            "content_type": "application/octet-stream",
+        })
+        if response.status_code in [404, 405, 501]:
+            raise ResumableUploadUnsupported(f"{client.api_url} has no chunked upload sessions")
+        if response.status_code not in [200, 201]:
+            raise Exception(f"Failed to start upload: {response.status_code} - {response.text}")
+        session = response.json()
+        journal = {
+            "path": str(file_path.resolve()),
+            "api_url": client.api_url,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "upload_id": session["upload_id"],
+            "chunk_size": session.get("chunk_size", chunk_size),
+            "chunks": {},
+        }
+        _save_upload_journal(journal_file, journal)
+    
+    chunk_size = journal["chunk_size"]
+    chunk_count = max(1, -(-st.st_size // chunk_size))
+    upload_id = journal["upload_id"]
+    done_bytes = sum(min(chunk_size, st.st_size - i * chunk_size) for i in received)
+    if progress:
+        progress.update(str(filepath), done_bytes)
     
-    headers = {"Authorization": f"Bearer {token}"}
+    with open(file_path, 'rb') as f:
+        for index in range(chunk_count):
+            if index in received and str(index) in journal["chunks"]:
+                continue
+            f.seek(index * chunk_size)
+            chunk = f.read(chunk_size)
+            digest = hashlib.sha256(chunk).hexdigest()
+            if index in received:
+                # Stored by the server, but the connection dropped before it
+                # was journaled: only its checksum is needed for /complete
+                journal["chunks"][str(index)] = digest
+                _save_upload_journal(journal_file, journal)
+                continue
+            response = client.request(
+                "PUT",
+                f"/api/v1/upload/asset/sessions/{upload_id}/chunks/{index}",
+                data=chunk,
+                headers={"Content-Type": "application/octet-stream", "X-Chunk-SHA256": digest}
+            )
+            if response.status_code not in [200, 201, 204]:
+                raise Exception(f"Failed to upload chunk {index}: {response.status_code} - {response.text}")
+            
+            journal["chunks"][str(index)] = digest
+            _save_upload_journal(journal_file, journal)
+            done_bytes += len(chunk)
+            if progress:
+                progress.update(str(filepath), done_bytes)
     
-    response = requests.post(
-        f"{api_url}/api/v1/contexts",
-        json=payload,
-        headers=headers
+    response = client.post(
+        f"/api/v1/upload/asset/sessions/{upload_id}/complete",
+        json={"chunks": [journal["chunks"].get(str(i)) for i in range(chunk_count)]}
     )
+    if response.status_code not in [200, 201]:
+        raise Exception(f"Failed to complete upload: {response.status_code} - {response.text}")
     
-    if response.status_code in [200, 201]:
-        return response.json()
-    else:
-        raise Exception(f"Failed to publish context: {response.status_code} - {response.text}")
+    journal_file.unlink(missing_ok=True)
+    return response.json()
 
+
+# ============================================
+# DAEMON
+# ============================================
+
+# 'agenco daemon' keeps the registries and search index loaded and answers
+# read-only lookups over a Unix socket. Each request and response is one
+# line of JSON. Callers fall back to running in-process when no daemon is
+# listening.
+DAEMON_SOCKET = Path(os.getenv("AGENCO_SOCKET", str(CONFIG_DIR / "daemon.sock")))
+DAEMON_POLL_INTERVAL = 2.0
+DAEMON_TIMEOUT = 5.0
+
+# Functions the daemon will run for clients
+DAEMON_OPS = (
+    "get_agents", "get_agent", "get_agent_content",
+    "get_contexts", "get_context", "get_context_content",
+    "get_prompts", "get_prompt", "get_prompt_content",
+    "search_all", "search_ranked", "get_stats", "get_search_index_status",
+    "get_content_cache_stats", "clear_content_cache",
+)
+
+
+# Set once a connection attempt fails, so later calls skip straight to in-process
+_daemon_unavailable = False
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket."""
+
+
+def _daemon_send(request: dict, socket_path: Path = None) -> dict:
+    """Send one request to the daemon and return its decoded response."""
+    import socket
+    
+    socket_path = socket_path or DAEMON_SOCKET
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        raise DaemonUnavailable(str(socket_path))
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(DAEMON_TIMEOUT)
+    try:
+        try:
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+            with sock.makefile('rb') as f:
+                line = f.readline()
+        except OSError as e:
+            # Refused, timed out (e.g. a slow index build), or reset by a
+            # daemon that was restarted or killed
+            raise DaemonUnavailable(str(e) or type(e).__name__)
+    finally:
+        sock.close()
+    
+    if not line:
+        raise DaemonUnavailable("daemon closed the connection")
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise DaemonUnavailable(f"bad response from daemon: {e}")
+
+
+def _daemon_error(response: dict) -> Optional[Exception]:
+    """The builtin exception a failed daemon call raised, or None if it can't be rebuilt."""
+    import builtins
+    
+    error_type = getattr(builtins, str(response.get("type")), None)
+    if not (isinstance(error_type, type) and issubclass(error_type, Exception)):
+        return None
+    try:
+        return error_type(response.get("error", "daemon request failed"))
+    except TypeError:  # Needs other arguments (e.g. UnicodeDecodeError)
+        return None
+
+
+def daemon_request(op: str, *args, **kwargs):
+    """
+    Run a DAEMON_OPS function in the daemon.
+    
+    Raises DaemonUnavailable when no daemon is running or the request
+    fails on the way, and re-raises builtin errors from the function
+    itself. Other errors also raise DaemonUnavailable, so callers run the
+    function in-process and get its own exception.
+    """
+    global _daemon_unavailable
+    if _daemon_unavailable:
+        raise DaemonUnavailable(str(DAEMON_SOCKET))
+    try:
+        with span(f"daemon {op}", "daemon"):
+            response = _daemon_send({"op": op, "args": args, "kwargs": kwargs})
+    except DaemonUnavailable:
+        _daemon_unavailable = True
+        raise
+    
+    if response.get("ok"):
+        return response.get("result")
+    error = _daemon_error(response)
+    if error is None:
+        raise DaemonUnavailable(f"{response.get('type')}: {response.get('error')}")
+    raise error
+
+
+def daemon_proxy(func):
+    """
+    Wrap a DAEMON_OPS function so it is answered by the daemon when one is
+    running, and runs in-process otherwise. Set AGENCO_NO_DAEMON=1 to
+    always run in-process.
+    """
+    import functools
+    
+    if func.__name__ not in DAEMON_OPS:
+        raise ValueError(f"'{func.__name__}' is not served by the daemon")
+    if os.getenv("AGENCO_NO_DAEMON"):
+        return func
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return daemon_request(func.__name__, *args, **kwargs)
+        except DaemonUnavailable:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def get_daemon_status(socket_path: Path = None) -> Optional[dict]:
+    """Return the running daemon's status, or None if none is running."""
+    try:
+        response = _daemon_send({"op": "status"}, socket_path)
+    except (DaemonUnavailable, OSError, ValueError):
+        return None
+    return response.get("result")
+
+
+def stop_daemon(socket_path: Path = None) -> bool:
+    """Ask the running daemon to exit. Returns False if none was running."""
+    try:
+        _daemon_send({"op": "shutdown"}, socket_path)
+    except (DaemonUnavailable, OSError, ValueError):
+        return False
+    return True
+
+
+def serve_daemon(socket_path: Path = None, poll_interval: float = DAEMON_POLL_INTERVAL) -> None:
+    """
+    Serve DAEMON_OPS over a Unix socket until stopped.
+    
+    A background thread re-checks the registries and referenced files every
+    poll_interval seconds, so edits are picked up without a restart.
+    """
+    import socket
+    import socketserver
+    
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError("The daemon needs Unix domain sockets, which this platform lacks")
+    
+    socket_path = Path(socket_path or DAEMON_SOCKET)
+    if get_daemon_status(socket_path) is not None:
+        raise ValueError(f"A daemon is already running on {socket_path}")
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # Left behind by a daemon that did not exit cleanly
+    
+    lock = threading.Lock()
+    stopping = threading.Event()
+    started = time.time()
+    requests_served = [0]
+    
+    def refresh():
+        update_search_index()  # Reloads any registry or file that changed
+    
+    def watch():
+        while not stopping.wait(poll_interval):
+            try:
+                with lock:
+                    refresh()
+            except Exception:
+                pass  # Keep watching; the next poll will retry
+    
+    def handle(request: dict) -> dict:
+        op = request.get("op")
+        if op == "status":
+            return {"ok": True, "result": {
+                "pid": os.getpid(),
+                "socket": str(socket_path),
+                "uptime": time.time() - started,
+                "requests": requests_served[0],
+            }}
+        if op == "shutdown":
+            stopping.set()
+            return {"ok": True, "result": None}
+        if op not in DAEMON_OPS:
+            return {"ok": False, "type": "ValueError", "error": f"Unknown operation: {op}"}
+        try:
+            with lock:
+                result = globals()[op](*request.get("args", []), **request.get("kwargs", {}))
+                requests_served[0] += 1
+            return {"ok": True, "result": result}
+        except Exception as e:
+            return {"ok": False, "type": type(e).__name__, "error": str(e)}
+    
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    response = handle(json.loads(line))
+                except ValueError as e:
+                    response = {"ok": False, "type": "ValueError", "error": f"Bad request: {e}"}
+                self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+                self.wfile.flush()
+                if stopping.is_set():
+                    # Stop once the shutdown request has been answered
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                    return
+    
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+    
+    refresh()
+    old_umask = os.umask(0o077)  # Socket is only reachable by this user
+    try:
+        server = Server(str(socket_path), Handler)
+    finally:
+        os.umask(old_umask)
+    
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        server.serve_forever()
+    finally:
+        stopping.set()
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
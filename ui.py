@@ -10,19 +10,24 @@ from rich.text import Text
 from rich.align import Align
 from rich import box
 
+import ui_components
 from ui_components import (
     console,
     COLORS,
     clear_screen,
     print_header,
-    print_stats,
-    agents_menu,
-    contexts_menu,
-    prompts_menu,
-    search_menu,
-    publish_menu
+    print_stats
 )
 
+# Menu option -> submenu, loaded the first time it is selected
+MENUS = {
+    "1": "agents_menu",
+    "2": "contexts_menu",
+    "3": "prompts_menu",
+    "4": "search_menu",
+    "5": "publish_menu",
+}
+
 
 def main_menu():
     """Main menu loop."""
@@ -44,16 +49,8 @@ def main_menu():
         console.print()
         choice = Prompt.ask("Select option", default="0")
         
-        if choice == "1":
-            agents_menu()
-        elif choice == "2":
-            contexts_menu()
-        elif choice == "3":
-            prompts_menu()
-        elif choice == "4":
-            search_menu()
-        elif choice == "5":
-            publish_menu()
+        if choice in MENUS:
+            getattr(ui_components, MENUS[choice])()
         elif choice == "0" or choice.lower() in ["q", "quit", "exit"]:
             clear_screen()
             console.print(Panel(
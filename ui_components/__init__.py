@@ -1,8 +1,13 @@
 """
 UI Components Package
 Modular UI components for Agenco CLI
+
+The menus are imported on first use, so starting the UI only loads what
+the main screen needs.
 """
 
+import importlib
+
 from .common import console, COLORS, VERSION, clear_screen, wait_for_key
 from .display import (
     print_header,
@@ -11,11 +16,24 @@ from .display import (
     print_error,
     print_info
 )
-from .agents import agents_menu
-from .contexts import contexts_menu
-from .prompts import prompts_menu
-from .search import search_menu
-from .publish import publish_menu
+
+# Lazily loaded attribute -> submodule that defines it
+_LAZY_MENUS = {
+    'agents_menu': 'agents',
+    'contexts_menu': 'contexts',
+    'prompts_menu': 'prompts',
+    'search_menu': 'search',
+    'publish_menu': 'publish',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_MENUS:
+        module = importlib.import_module(f".{_LAZY_MENUS[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'console',
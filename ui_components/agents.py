@@ -13,11 +13,12 @@ from rich import box
 from .common import console, COLORS, clear_screen, wait_for_key
 from .display import print_success, print_error, print_info
 from core import (
-    get_agents, get_agent, get_agent_content,
-    add_agent, remove_agent, copy_to_clipboard
+    get_agents, get_agent, get_agent_content, get_agent_preview, format_size,
+    add_agent, remove_agent, copy_to_clipboard, traced
 )
 
 
+@traced("ui")
 def show_agents_table():
     """Display agents in a table."""
     agents = get_agents()
@@ -50,6 +51,7 @@ def show_agents_table():
     console.print(table)
 
 
+@traced("ui")
 def show_agent_details(name: str):
     """Show detailed view of an agent."""
     agent = get_agent(name)
@@ -66,16 +68,18 @@ def show_agent_details(name: str):
     # Description
     console.print(f"\n[bold]Description:[/] {agent.get('description', 'N/A')}")
     
+    # Content preview (reads only the start of the first files)
+    preview = get_agent_preview(name, 500)
+    
     # Files
     console.print(f"\n[bold]Files:[/]")
-    for f in agent.get("files", []):
-        console.print(f"  [dim]•[/] {f}")
+    for f in preview["files"]:
+        size = format_size(f["size"]) if f["size"] is not None else "missing"
+        console.print(f"  [dim]•[/] {f['path']} [dim]({size})[/]")
     
-    # Content preview
-    content = get_agent_content(name)
-    if content:
+    if preview["text"]:
         console.print(f"\n[bold]Content Preview:[/]")
-        preview = content[:500] + ("..." if len(content) > 500 else "")
+        preview = preview["text"] + ("..." if preview["truncated"] else "")
         syntax = Syntax(preview, "markdown", theme="monokai", line_numbers=False)
         console.print(Panel(syntax, border_style="dim"))
 
@@ -13,11 +13,12 @@ from rich import box
 from .common import console, COLORS, clear_screen, wait_for_key
 from .display import print_success, print_error, print_info
 from core import (
-    get_contexts, get_context, get_context_content,
-    add_context, remove_context, copy_to_clipboard
+    get_contexts, get_context, get_context_content, get_context_preview, format_size,
+    add_context, remove_context, copy_to_clipboard, traced
 )
 
 
+@traced("ui")
 def show_contexts_table():
     """Display contexts in a table."""
     contexts = get_contexts()
@@ -50,6 +51,7 @@ def show_contexts_table():
     console.print(table)
 
 
+@traced("ui")
 def show_context_details(name: str):
     """Show detailed view of a context."""
     ctx = get_context(name)
@@ -66,16 +68,18 @@ def show_context_details(name: str):
     # Description
     console.print(f"\n[bold]Description:[/] {ctx.get('description', 'N/A')}")
     
+    # Content preview (reads only the start of the first files)
+    preview = get_context_preview(name, 500)
+    
     # Files
     console.print(f"\n[bold]Files:[/]")
-    for f in ctx.get("files", []):
-        console.print(f"  [dim]•[/] {f}")
+    for f in preview["files"]:
+        size = format_size(f["size"]) if f["size"] is not None else "missing"
+        console.print(f"  [dim]•[/] {f['path']} [dim]({size})[/]")
     
-    # Content preview
-    content = get_context_content(name)
-    if content:
+    if preview["text"]:
         console.print(f"\n[bold]Content Preview:[/]")
-        preview = content[:500] + ("..." if len(content) > 500 else "")
+        preview = preview["text"] + ("..." if preview["truncated"] else "")
         syntax = Syntax(preview, "markdown", theme="monokai", line_numbers=False)
         console.print(Panel(syntax, border_style="dim"))
 
@@ -9,9 +9,10 @@ from rich.panel import Panel
 from rich import box
 
 from .common import console, COLORS, VERSION
-from core import get_stats
+from core import get_stats, traced
 
 
+@traced("ui")
 def print_header():
     """Print the main header."""
     header = Text()
@@ -29,6 +30,7 @@ def print_header():
     console.print(panel)
 
 
+@traced("ui")
 def print_stats():
     """Print statistics bar."""
     stats = get_stats()
@@ -0,0 +1,299 @@
+"""
+Live Search UI
+As-you-type search: results are re-queried on each keystroke
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from rich.console import Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+from rich import box
+
+from .common import console, COLORS
+from core import search_ranked, update_search_index, traced
+
+# Wait this long after a keystroke before querying, so fast typing only
+# runs the last query
+DEBOUNCE_SECONDS = 0.05
+# Redraw at most this often
+FRAME_SECONDS = 1 / 30
+RESULT_LIMIT = 15
+# Finished queries kept per session (most recently used)
+CACHE_SIZE = 64
+
+
+def live_search_supported() -> bool:
+    """Whether the terminal can do as-you-type search (AGENCO_LIVE_SEARCH=0 turns it off)."""
+    if os.getenv("AGENCO_LIVE_SEARCH", "1").lower() in ("0", "false", "no"):
+        return False
+    return sys.stdin.isatty() and console.is_terminal
+
+
+class RawKeys:
+    """Read keypresses without waiting for Enter (termios on POSIX, msvcrt on Windows)."""
+    
+    ESCAPES = {"\x1b[A": "up", "\x1b[B": "down", "\x1bOA": "up", "\x1bOB": "down"}
+    
+    def __enter__(self):
+        try:
+            import termios
+            import tty
+        except ImportError:  # Windows
+            self._termios = None
+            return self
+        self._termios = termios
+        self._fd = sys.stdin.fileno()
+        self._saved = termios.tcgetattr(self._fd)
+        tty.setcbreak(self._fd)
+        return self
+    
+    def __exit__(self, *exc):
+        if self._termios:
+            self._termios.tcsetattr(self._fd, self._termios.TCSADRAIN, self._saved)
+        return False
+    
+    def read(self, timeout: float) -> list:
+        """Keys pressed within timeout: characters, or 'up', 'down', 'enter', 'esc', 'backspace', 'clear'."""
+        if self._termios is None:
+            return self._read_windows(timeout)
+    
+        import select
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self._fd, 1024).decode("utf-8", errors="ignore")
+    
+        keys = []
+        i = 0
+        while i < len(data):
+            if data[i] == "\x1b":
+                sequence = data[i:i + 3]
+                if sequence in self.ESCAPES:
+                    keys.append(self.ESCAPES[sequence])
+                    i += 3
+                    continue
+                if len(data) == 1:
+                    keys.append("esc")
+                # Skip other escape sequences (e.g. left/right arrows)
+                i += 3 if data[i + 1:i + 2] in ("[", "O") else 1
+                continue
+            keys.append(self._key(data[i]))
+            i += 1
+        return keys
+    
+    def _read_windows(self, timeout: float) -> list:
+        import msvcrt
+        deadline = time.monotonic() + timeout
+        while not msvcrt.kbhit():
+            if time.monotonic() >= deadline:
+                return []
+            time.sleep(0.01)
+        keys = []
+        while msvcrt.kbhit():
+            char = msvcrt.getwch()
+            if char in ("\x00", "\xe0"):
+                keys.append({"H": "up", "P": "down"}.get(msvcrt.getwch(), ""))
+            elif char == "\x1b":
+                keys.append("esc")
+            else:
+                keys.append(self._key(char))
+        return [key for key in keys if key]
+    
+    @staticmethod
+    def _key(char: str) -> str:
+        if char in ("\r", "\n"):
+            return "enter"
+        if char in ("\x7f", "\x08"):
+            return "backspace"
+        if char == "\x15":  # Ctrl+U
+            return "clear"
+        if char == "\x03":  # Ctrl+C
+            raise KeyboardInterrupt
+        return char if char.isprintable() else ""
+
+
+class SearchWorker(threading.Thread):
+    """
+    Runs queries off the input thread. Only the latest submitted query is
+    run; results of a query that was superseded while running are dropped.
+    Each query publishes names first, then again with snippets. The last
+    CACHE_SIZE finished queries are kept, so backspacing is instant.
+    Call stop() and join() when done.
+    """
+    
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = None
+        self._cache = OrderedDict()
+        self.generation = 0
+        self.state = {"query": "", "results": [], "error": None, "busy": False, "elapsed": 0.0, "generation": 0}
+    
+    def submit(self, query: str) -> None:
+        with self._lock:
+            self.generation += 1
+            self._pending = (self.generation, query)
+            self.state["busy"] = True
+        self._wake.set()
+    
+    def stop(self) -> None:
+        """Make the thread exit after the query it is running, if any."""
+        with self._lock:
+            self.generation += 1
+            self._pending = None
+        self._wake.set()
+    
+    def _publish(self, generation: int, **changes) -> bool:
+        with self._lock:
+            if generation != self.generation:
+                return False  # Stale: a newer query was submitted
+            self.state.update(changes, generation=generation)
+            return True
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.state)
+    
+    def run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                self._wake.clear()
+                if self._pending is None:
+                    return
+                generation, query = self._pending
+    
+            start = time.perf_counter()
+            if not query.strip():
+                self._publish(generation, query=query, results=[], error=None, busy=False, elapsed=0.0)
+                continue
+            if query in self._cache:
+                self._cache.move_to_end(query)
+                self._publish(generation, query=query, results=self._cache[query], error=None, busy=False,
+                              elapsed=time.perf_counter() - start)
+                continue
+            try:
+                results = search_ranked(query, RESULT_LIMIT, refresh=False, snippets=False)
+                if not self._publish(generation, query=query, results=results, error=None,
+                                     elapsed=time.perf_counter() - start):
+                    continue
+                results = search_ranked(query, RESULT_LIMIT, refresh=False)
+                self._cache[query] = results
+                if len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+                self._publish(generation, results=results, busy=False)
+            except ValueError as e:
+                self._publish(generation, query=query, results=[], error=str(e), busy=False)
+            except Exception as e:
+                # Keep serving later queries rather than leave the UI waiting forever
+                self._publish(generation, query=query, results=[], error=f"Search failed: {e}", busy=False)
+
+
+@traced("ui")
+def _render(query: str, state: dict, selected: int):
+    """Input line, status line and results table."""
+    prompt = Text("Search: ", style=f"bold {COLORS['search']}")
+    prompt.append(query)
+    prompt.append("█", style="blink")
+    
+    if state["error"]:
+        status = Text(state["error"], style=COLORS["error"])
+    elif not query.strip():
+        status = Text("Type to search · ↑/↓ select · Enter copy · Esc back", style="dim")
+    else:
+        count = len(state["results"])
+        status = Text(f"{count} result{'s' if count != 1 else ''} · {state['elapsed'] * 1000:.0f} ms", style="dim")
+        if state["busy"]:
+            status.append(" · searching…", style="dim italic")
+    
+    table = Table(box=box.SIMPLE, header_style=f"bold {COLORS['search']}", expand=True)
+    table.add_column("Name", min_width=12, no_wrap=True)
+    table.add_column("Type", style="dim", width=8)
+    table.add_column("Score", style="dim", justify="right", width=6)
+    table.add_column("Match", ratio=1, no_wrap=True, overflow="ellipsis")
+    for i, result in enumerate(state["results"]):
+        detail = result["snippet"] or result["item"].get("description", "")
+        row_style = "reverse" if i == selected else None
+        table.add_row(
+            Text(result["name"], style=f"bold {COLORS[result['type'] + 's']}"),
+            result["type"],
+            f"{result['score']:.2f}",
+            detail,
+            style=row_style
+        )
+    return Group(prompt, status, table)
+
+
+def live_search() -> dict:
+    """
+    Run as-you-type search until Enter or Esc.
+    
+    Returns the selected result, or None if the user left with Esc.
+    """
+    update_search_index()  # Once up front; keystrokes query the in-memory index
+    worker = SearchWorker()
+    worker.start()
+    try:
+        return _input_loop(worker)
+    finally:
+        worker.stop()
+        worker.join()
+
+
+def _input_loop(worker: SearchWorker) -> dict:
+    """Read keys and redraw until Enter or Esc; see live_search."""
+    query = ""
+    selected = 0
+    submitted_at = None  # When the current query should be sent (debounce)
+    accepting = False  # Enter was pressed; pick a result once the query is answered
+    shown = None
+    
+    with RawKeys() as keys, Live(console=console, auto_refresh=False, transient=True) as live:
+        while True:
+            for key in keys.read(FRAME_SECONDS):
+                if key == "esc":
+                    return None
+                if key == "enter":
+                    # Send a query still in its debounce window right away
+                    # rather than answering with the previous query's results
+                    if submitted_at is not None:
+                        submitted_at = time.monotonic()
+                    accepting = True
+                    continue
+                accepting = False
+                if key == "up":
+                    selected = max(0, selected - 1)
+                elif key == "down":
+                    selected += 1
+                elif key == "backspace":
+                    query = query[:-1]
+                    submitted_at = time.monotonic() + DEBOUNCE_SECONDS
+                elif key == "clear":
+                    query = ""
+                    submitted_at = time.monotonic() + DEBOUNCE_SECONDS
+                elif key:
+                    query += key
+                    submitted_at = time.monotonic() + DEBOUNCE_SECONDS
+    
+            if submitted_at is not None and time.monotonic() >= submitted_at:
+                worker.submit(query)
+                submitted_at = None
+                selected = 0
+    
+            state = worker.snapshot()
+            if accepting and submitted_at is None and not state["busy"] and state["generation"] == worker.generation:
+                accepting = False
+                if state["results"]:
+                    return state["results"][min(selected, len(state["results"]) - 1)]
+            selected = min(selected, max(0, len(state["results"]) - 1))
+            frame = (query, state["generation"], state["busy"], id(state["results"]), selected)
+            if frame != shown:
+                live.update(_render(query, state, selected), refresh=True)
+                shown = frame
@@ -14,10 +14,11 @@ from .common import console, COLORS, clear_screen, wait_for_key
 from .display import print_success, print_error, print_info
 from core import (
     get_prompts, get_prompt, get_prompt_content,
-    add_prompt, remove_prompt, copy_to_clipboard
+    add_prompt, remove_prompt, copy_to_clipboard, traced
 )
 
 
+@traced("ui")
 def show_prompts_table():
     """Display prompts in a table."""
     prompts = get_prompts()
@@ -50,6 +51,7 @@ def show_prompts_table():
     console.print(table)
 
 
+@traced("ui")
 def show_prompt_details(name: str):
     """Show detailed view of a prompt."""
     prompt = get_prompt(name)
@@ -15,8 +15,10 @@ from core import (
     get_agents,
     get_contexts,
     get_prompts,
+    get_directory_files,
     publish_agent,
     publish_context,
+    publish_context_from_directory,
     publish_prompt
 )
 
@@ -34,6 +36,7 @@ def publish_menu():
         console.print(f"  [{COLORS['info']}][1][/] Publish Agent")
         console.print(f"  [{COLORS['info']}][2][/] Publish Context")
         console.print(f"  [{COLORS['info']}][3][/] Publish Prompt")
+        console.print(f"  [{COLORS['info']}][4][/] Publish Context from Directory")
         console.print()
         console.print(f"  [{COLORS['info']}][0][/] Back to main menu")
         
@@ -46,6 +49,8 @@ def publish_menu():
             publish_context_interactive()
         elif choice == "3":
             publish_prompt_interactive()
+        elif choice == "4":
+            publish_directory_interactive()
         elif choice == "0":
             break
 
@@ -279,3 +284,107 @@ def publish_prompt_interactive():
     
     console.print()
     wait_for_key()
+
+
+def publish_directory_interactive():
+    """Interactive context publishing from a directory, with upload progress."""
+    from rich.progress import Progress, BarColumn, DownloadColumn, TransferSpeedColumn, TimeRemainingColumn, TextColumn
+    
+    clear_screen()
+    print_header()
+    console.print()
+    console.print(f"[{COLORS['info']}]Publish Context from Directory[/]", style="bold")
+    console.print()
+    
+    # Select directory
+    directory = Prompt.ask("Directory (press Enter for current directory)", default=".")
+    try:
+        files_info = get_directory_files(directory)
+    except OSError as e:
+        print_error(f"Cannot read directory: {e}")
+        wait_for_key()
+        return
+    
+    text_files = files_info['text_files']
+    asset_files = files_info['asset_files']
+    if not text_files:
+        print_error("No text files found in directory to publish.")
+        wait_for_key()
+        return
+    
+    console.print()
+    console.print(f"[{COLORS['muted']}]Directory:[/] {files_info['directory']}")
+    console.print(f"[{COLORS['muted']}]Text files:[/] {len(text_files)}")
+    console.print(f"[{COLORS['muted']}]Asset files:[/] {len(asset_files)}")
+    console.print()
+    
+    name = Prompt.ask("Context name", default=files_info['directory_name'])
+    
+    # Get authentication
+    token = os.getenv("AGENCO_TOKEN")
+    if not token:
+        console.print()
+        console.print(f"[{COLORS['warning']}]Authentication required.[/]")
+        console.print(f"Set AGENCO_TOKEN environment variable or enter token now.")
+        console.print()
+        token = Prompt.ask("API Token (press Enter to cancel)", default="")
+        if not token:
+            return
+    
+    # Get API URL
+    api_url = os.getenv("AGENCO_API_URL", "https://api.agenco.dev")
+    use_custom_url = Prompt.ask(
+        f"Use custom API URL? (current: {api_url})",
+        choices=["y", "n"],
+        default="n"
+    )
+    if use_custom_url == "y":
+        api_url = Prompt.ask("API URL", default=api_url)
+    
+    # Publish
+    console.print()
+    console.print(f"[{COLORS['info']}]Publishing context '{name}' to marketplace...[/]")
+    
+    failed = []
+    try:
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            console=console
+        ) as progress_bar:
+            total = sum(f['size'] for f in asset_files)
+            task = progress_bar.add_task(f"Uploading 0/{len(asset_files)} assets", total=total or None)
+            
+            def on_progress(progress):
+                progress_bar.update(
+                    task,
+                    completed=progress.sent,
+                    description=f"Uploading {progress.files_done}/{progress.files_total} assets"
+                )
+                failed[:] = progress.failed
+            
+            result = publish_context_from_directory(
+                directory=directory,
+                name=name,
+                api_url=api_url,
+                token=token,
+                progress_listener=on_progress
+            )
+        
+        console.print()
+        for path, error in failed:
+            print_error(f"Failed to upload {os.path.basename(path)}: {error}")
+        print_success(f"Successfully published '{name}'!")
+        if result.get("id"):
+            console.print(f"  [{COLORS['muted']}]ID:[/] {result['id']}")
+        if result.get("url"):
+            console.print(f"  [{COLORS['muted']}]URL:[/] {result['url']}")
+    except Exception as e:
+        console.print()
+        print_error(f"Failed to publish: {str(e)}")
+    
+    console.print()
+    wait_for_key()
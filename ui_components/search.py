@@ -4,17 +4,39 @@ Functions for searching across all resources
 """
 
 from rich.panel import Panel
+from rich.table import Table
 from rich.text import Text
 from rich.prompt import Prompt
 from rich import box
 
 from .common import console, COLORS, clear_screen, wait_for_key
 from .display import print_info
-from core import search_all, get_agent_content, get_context_content, get_prompt_content, copy_to_clipboard
+from core import search_ranked, get_agent_content, get_context_content, get_prompt_content, copy_to_clipboard
+
+
+def _copy_result(result: dict):
+    """Copy a search result's content to the clipboard."""
+    item_type, item_name = result["type"], result["name"]
+    
+    content = None
+    if item_type == "agent":
+        content = get_agent_content(item_name)
+    elif item_type == "context":
+        content = get_context_content(item_name)
+    elif item_type == "prompt":
+        content = get_prompt_content(item_name)
+    
+    if content and copy_to_clipboard(content):
+        from .display import print_success
+        print_success(f"'{item_name}' copied to clipboard!")
+    else:
+        from .display import print_error
+        print_error("Failed to copy to clipboard.")
+    wait_for_key()
 
 
 def search_menu():
-    """Search interface."""
+    """Search interface: as-you-type in a terminal, otherwise a single query."""
     clear_screen()
     
     # Header
@@ -28,8 +50,16 @@ def search_menu():
     console.print()
     
     console.print("[dim]Searches in names, descriptions, and file contents[/]")
+    console.print("[dim]All words must match; use OR for alternatives, type:agent|context|prompt to filter[/]")
     console.print()
     
+    from .live_search import live_search, live_search_supported
+    if live_search_supported():
+        result = live_search()
+        if result:
+            _copy_result(result)
+        return
+    
     query = Prompt.ask("Enter search query")
     
     if not query.strip():
@@ -37,39 +67,43 @@ def search_menu():
         wait_for_key()
         return
     
-    results = search_all(query)
-    total = sum(len(v) for v in results.values())
+    try:
+        results = search_ranked(query)
+    except ValueError as e:
+        from .display import print_error
+        print_error(str(e))
+        wait_for_key()
+        return
     
     console.print()
     
-    if total == 0:
+    if not results:
         print_info(f"No results found for '{query}'")
         wait_for_key()
         return
     
-    console.print(f"[bold]Found {total} result{'s' if total != 1 else ''} for '[{COLORS['search']}]{query}[/]':[/]")
-    console.print("[dim](including matches in file contents)[/]\n")
-    
-    # Agents results
-    if results["agents"]:
-        console.print(f"[{COLORS['agents']}]Agents ({len(results['agents'])}):[/]")
-        for agent in results["agents"]:
-            console.print(f"   - [{COLORS['agents']}]{agent['name']}[/] - {agent.get('description', '')}")
-        console.print()
-    
-    # Contexts results
-    if results["contexts"]:
-        console.print(f"[{COLORS['contexts']}]Contexts ({len(results['contexts'])}):[/]")
-        for ctx in results["contexts"]:
-            console.print(f"   - [{COLORS['contexts']}]{ctx['name']}[/] - {ctx.get('description', '')}")
-        console.print()
-    
-    # Prompts results
-    if results["prompts"]:
-        console.print(f"[{COLORS['prompts']}]Prompts ({len(results['prompts'])}):[/]")
-        for prompt in results["prompts"]:
-            console.print(f"   - [{COLORS['prompts']}]{prompt['name']}[/] - {prompt.get('description', '')}")
-        console.print()
+    total = len(results)
+    console.print(f"[bold]Top {total} result{'s' if total != 1 else ''} for '[{COLORS['search']}]{query}[/]':[/]")
+    console.print("[dim](best matches first, including matches in file contents)[/]\n")
+    
+    table = Table(box=box.ROUNDED, header_style=f"bold {COLORS['search']}", border_style=COLORS["search"], show_lines=True)
+    table.add_column("#", style="dim", justify="right")
+    table.add_column("Name", min_width=12)
+    table.add_column("Score", style="dim", justify="right")
+    table.add_column("Match", style="white")
+    
+    for rank, result in enumerate(results, 1):
+        color = COLORS[result["type"] + "s"]
+        name = Text(result["name"], style=f"bold {color}")
+        name.append(f"\n{result['type']}", style="dim")
+        match = Text(result["item"].get("description", ""))
+        if result["snippet"] and result["snippet"] != result["item"].get("description"):
+            match.append(f"\n{result['match']}: ", style="dim")
+            match.append(result["snippet"], style="italic")
+        table.add_row(str(rank), name, f"{result['score']:.2f}", match)
+    
+    console.print(table)
+    console.print()
     
     # Quick actions
     console.print("[dim]Quick actions:[/]")
@@ -80,32 +114,5 @@ def search_menu():
     choice = Prompt.ask("Select option", default="0")
     
     if choice == "1":
-        # Collect all names
-        all_items = []
-        for agent in results["agents"]:
-            all_items.append(("agent", agent["name"]))
-        for ctx in results["contexts"]:
-            all_items.append(("context", ctx["name"]))
-        for prompt in results["prompts"]:
-            all_items.append(("prompt", prompt["name"]))
-        
-        if all_items:
-            names = [f"{t}:{n}" for t, n in all_items]
-            selected = Prompt.ask("Select item (type:name)", choices=names)
-            item_type, item_name = selected.split(":", 1)
-            
-            content = None
-            if item_type == "agent":
-                content = get_agent_content(item_name)
-            elif item_type == "context":
-                content = get_context_content(item_name)
-            elif item_type == "prompt":
-                content = get_prompt_content(item_name)
-            
-            if content and copy_to_clipboard(content):
-                from .display import print_success
-                print_success(f"'{item_name}' copied to clipboard!")
-            else:
-                from .display import print_error
-                print_error("Failed to copy to clipboard.")
-            wait_for_key()
+        selected = Prompt.ask("Result number", choices=[str(n) for n in range(1, total + 1)])
+        _copy_result(results[int(selected) - 1])